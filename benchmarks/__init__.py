@@ -0,0 +1 @@
+"""Бенчмарки cs_logchecker: python benchmarks/<имя>.py --help"""
@@ -0,0 +1,250 @@
+"""
+Бенчмарк обработки лог-файла на синтетических данных (benchmarks/loggen.py).
+
+Измеряется:
+  - время этапов основного режима (grep_to_buffer, get_last_line,
+    del_old_log_in_buffer_file, process_files, update_lasttime) в одном процессе;
+  - полное время запуска cs_logchecker.py (отдельный процесс) для режимов --modes:
+    первый запуск и повторный после дописывания --append-size в лог-файл.
+
+Результат выводится таблицей и, при --json, сохраняется в JSON для сравнения
+между запусками. С --baseline результаты сравниваются с сохраненными ранее:
+если метрика медленнее больше чем на --threshold, код завершения 1.
+
+Запуск: python benchmarks/bench_pipeline.py --size 100M --json result.json
+        python benchmarks/bench_pipeline.py --size 100M --baseline result.json --threshold 0.1
+"""
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from pathlib import Path
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+import cs_logchecker  # noqa: E402
+from benchmarks.loggen import MATCH_LEVEL, generate_log, parse_size  # noqa: E402
+
+# Режим -> дополнительные параметры командной строки
+MODES = {
+    "default": [],
+    "stream": ["--stream"],
+    "reverse": ["--reverse"],
+    "no-bisect": ["--stream", "--no-bisect"],
+}
+STAGES = ("grep_to_buffer", "get_last_line", "del_old_log_in_buffer_file", "process_files", "update_lasttime")
+# Запуск cs_logchecker.main() с каталогом кеша бенчмарка вместо DEFAULT_CACHE_PATH
+CLI_RUNNER = (
+    "import sys, cs_logchecker; "
+    "cs_logchecker.DEFAULT_CACHE_PATH = sys.argv.pop(1); "
+    "cs_logchecker.main()"
+)
+
+
+@contextmanager
+def quiet():
+    """Подавление вывода cs_logchecker во время замеров"""
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        yield
+
+
+def run_stages(log_path: Path, cache_path: Path, pattern: str, limit_lines: int) -> dict:
+    """
+    Этапы основного режима в том же порядке, что и в cs_logchecker.run().
+    Этапы после get_last_line выполняются, только если найдены новые строки.
+    """
+    cs_logchecker.DEFAULT_CACHE_PATH = str(cache_path)
+    timings = {}
+    with quiet():
+        cs_logchecker.init_global(str(log_path), "", ",", cs_logchecker.DEFAULT_FORMAT_LOGTIME,
+                                  pattern, "body", False, limit_lines)
+        last_time, cs_logchecker.LAST_POSITION = cs_logchecker.parse_lasttime_fields(
+            cs_logchecker.get_lasttime_fields())
+        cs_logchecker.LAST_CSV_TIME = cs_logchecker.LAST_LOG_TIME = last_time
+
+        start = time.perf_counter()
+        cs_logchecker.grep_to_buffer()
+        timings["grep_to_buffer"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        last_line = cs_logchecker.get_last_line(cs_logchecker.LOCAL_BUFFER_FILE)
+        timings["get_last_line"] = time.perf_counter() - start
+
+        if last_line and cs_logchecker.parse_log_time(last_line) > last_time:
+            cs_logchecker.LAST_LOG_TIME = cs_logchecker.parse_log_time(last_line)
+
+            start = time.perf_counter()
+            cs_logchecker.del_old_log_in_buffer_file(last_time)
+            timings["del_old_log_in_buffer_file"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            cs_logchecker.process_files()
+            timings["process_files"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        cs_logchecker.update_lasttime()
+        timings["update_lasttime"] = time.perf_counter() - start
+    return timings
+
+
+def run_cli(log_path: Path, cache_path: Path, pattern: str, limit_lines: int, mode_args: list) -> float:
+    """Полное время запуска cs_logchecker.py в отдельном процессе"""
+    command = [sys.executable, "-c", CLI_RUNNER, str(cache_path) + "/",
+               "-l", str(log_path), "--pattern", pattern, "--limit-lines", str(limit_lines), *mode_args]
+    start = time.perf_counter()
+    completed = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(mode_args) or 'default'}: код {completed.returncode}\n{completed.stderr}")
+    return elapsed
+
+
+def restore(snapshot: Path, cache_path: Path) -> None:
+    """Возврат каталога кеша к состоянию после первого запуска"""
+    shutil.rmtree(cache_path, ignore_errors=True)
+    shutil.copytree(snapshot, cache_path)
+
+
+def run_benchmark(args: argparse.Namespace, workdir: Path) -> dict:
+    log_path = workdir / "bench.log"
+    generated = generate_log(log_path, args.size, args.match_ratio, args.line_length, args.line_sigma,
+                             args.burstiness, args.burst_length, seed=args.seed)
+    print(f"Лог-файл: {generated['bytes']:,} байт, {generated['lines']:,} строк, "
+          f"{generated['matches']:,} совпадений", file=sys.stderr)
+
+    results = {}
+    # Первый запуск: для каждого режима свой каталог кеша
+    caches = {}
+    for mode in ["stages", *args.modes]:
+        cache_path = workdir / f"cache-{mode}"
+        best = None
+        for _ in range(args.repeat):
+            shutil.rmtree(cache_path, ignore_errors=True)
+            if mode == "stages":
+                timings = run_stages(log_path, cache_path, args.pattern, args.limit_lines)
+            else:
+                timings = {"e2e": run_cli(log_path, cache_path, args.pattern, args.limit_lines, MODES[mode])}
+            best = timings if best is None else {key: min(value, best.get(key, value)) for key, value in timings.items()}
+        for key, value in best.items():
+            results[f"first.{mode}.{key}"] = value
+        snapshot = workdir / f"snapshot-{mode}"
+        shutil.copytree(cache_path, snapshot)
+        caches[mode] = (cache_path, snapshot)
+
+    # Повторный запуск после дописывания в лог-файл
+    generate_log(log_path, args.append_size, args.match_ratio, args.line_length, args.line_sigma,
+                 args.burstiness, args.burst_length, start_time=generated["last_time"],
+                 seed=args.seed + 1, append=True)
+    for mode, (cache_path, snapshot) in caches.items():
+        best = None
+        for _ in range(args.repeat):
+            restore(snapshot, cache_path)
+            if mode == "stages":
+                timings = run_stages(log_path, cache_path, args.pattern, args.limit_lines)
+            else:
+                timings = {"e2e": run_cli(log_path, cache_path, args.pattern, args.limit_lines, MODES[mode])}
+            best = timings if best is None else {key: min(value, best.get(key, value)) for key, value in timings.items()}
+        for key, value in best.items():
+            results[f"incremental.{mode}.{key}"] = value
+
+    meta = {
+        "size": args.size,
+        "append_size": args.append_size,
+        "match_ratio": args.match_ratio,
+        "line_length": args.line_length,
+        "line_sigma": args.line_sigma,
+        "burstiness": args.burstiness,
+        "burst_length": args.burst_length,
+        "pattern": args.pattern,
+        "limit_lines": args.limit_lines,
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "lines": generated["lines"],
+        "matches": generated["matches"],
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(results: dict, baseline: dict, threshold: float, min_delta: float) -> list:
+    """
+    Сравнение с базовыми результатами
+    :return: Метрики, ставшие медленнее больше чем на threshold (и на min_delta секунд)
+    """
+    regressions = []
+    for key, value in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        ratio = value / base if base else float("inf")
+        mark = ""
+        if value > base * (1 + threshold) and value - base > min_delta:
+            regressions.append(key)
+            mark = "  REGRESSION"
+        print(f"{key:48} {base:9.3f} -> {value:9.3f} s  x{ratio:.2f}{mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк обработки лог-файла на синтетических данных")
+    parser.add_argument("--size", type=parse_size, default=parse_size("100M"),
+                        help="Размер лог-файла: 10M ... 20G. Default: 100M")
+    parser.add_argument("--append-size", type=parse_size, default=parse_size("10M"),
+                        help="Объем, дописываемый перед повторным запуском. Default: 10M")
+    parser.add_argument("--match-ratio", type=float, default=0.01)
+    parser.add_argument("--line-length", type=int, default=120)
+    parser.add_argument("--line-sigma", type=float, default=0.5)
+    parser.add_argument("--burstiness", type=float, default=0.0)
+    parser.add_argument("--burst-length", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pattern", default=MATCH_LEVEL)
+    parser.add_argument("--limit-lines", type=int, default=20)
+    parser.add_argument("--modes", type=lambda value: value.split(","), default=["default", "stream", "reverse"],
+                        help=f"Режимы через запятую: {', '.join(MODES)}. Default: default,stream,reverse")
+    parser.add_argument("--repeat", type=int, default=1, help="Повторы замера (берется минимум)")
+    parser.add_argument("--workdir", type=Path, help="Каталог для лог-файла и кеша (по умолчанию временный)")
+    parser.add_argument("--json", type=Path, help="Сохранить результат в JSON")
+    parser.add_argument("--baseline", type=Path, help="JSON с результатами для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Допустимое замедление относительно --baseline (доля). Default: 0.10")
+    parser.add_argument("--min-delta", type=float, default=0.05,
+                        help="Замедление меньше этого числа секунд не считается регрессией. Default: 0.05")
+    args = parser.parse_args()
+
+    unknown = [mode for mode in args.modes if mode not in MODES]
+    if unknown:
+        parser.error(f"неизвестные режимы: {unknown}")
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="bench_logchecker."))
+    workdir.mkdir(parents=True, exist_ok=True)
+    try:
+        report = run_benchmark(args, workdir)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    for key, value in report["results"].items():
+        print(f"{key:48} {value:9.3f} s")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))["results"]
+        print(f"\nСравнение с {args.baseline} (порог {args.threshold:.0%}):")
+        regressions = compare(report["results"], baseline, args.threshold, args.min_delta)
+        if regressions:
+            print(f"Регрессии: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Микробенчмарк разбора временных меток: прежняя реализация
+(re.sub + datetime.strptime на каждый вызов) против LogTimeParser.
+
+Запуск: python benchmarks/bench_timeparse.py [--lines N] [--format-logtime FORMAT]
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import re
+import sys
+import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import cs_logchecker  # noqa: E402
+
+
+def legacy_parse_log_time(log_line: str, format_str: str) -> datetime:
+    """Разбор как до LogTimeParser: нормализация формата и strptime на каждую строку"""
+    normalized_format = ' '.join(format_str.split())
+    segments = len(normalized_format.split())
+    time_stamp = ' '.join(log_line.split(maxsplit=segments)[:segments])
+    cleaned_format = re.sub(r"%\d*f", "%f", format_str)
+    return datetime.strptime(time_stamp, cleaned_format)
+
+
+def make_lines(count: int, format_str: str) -> list:
+    start = cs_logchecker.CustomDateTime(2026, 1, 1)
+    return [
+        f"{(start + timedelta(milliseconds=i * 37)).custom_strftime(format_str)} err T message {i}"
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк разбора временных меток")
+    parser.add_argument("--lines", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--format-logtime", default=cs_logchecker.DEFAULT_FORMAT_LOGTIME)
+    args = parser.parse_args()
+
+    lines = make_lines(args.lines, args.format_logtime)
+    time_parser = cs_logchecker.get_time_parser(args.format_logtime)
+
+    cases = {
+        "legacy strptime": lambda: [legacy_parse_log_time(line, args.format_logtime) for line in lines],
+        "LogTimeParser.parse_line": lambda: [time_parser.parse_line(line) for line in lines],
+        "LogTimeParser.parse_lines": lambda: time_parser.parse_lines(lines),
+    }
+    baseline = None
+    for name, func in cases.items():
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f"{name:28} {best:8.3f} s  {args.lines / best:12,.0f} lines/s  x{baseline / best:.1f}")
+
+
+if __name__ == "__main__":
+    main()
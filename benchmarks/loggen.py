@@ -0,0 +1,174 @@
+"""
+Генератор синтетических лог-файлов для бенчмарков.
+
+Строки имеют вид "<время> <уровень> [<компонент>] <текст>", время - в формате
+--format-logtime (по умолчанию DEFAULT_FORMAT_LOGTIME) и возрастает.
+Параметры: размер (10M ... 20G), доля строк с ошибкой (ERROR),
+распределение длины строк (логнормальное) и пачечность ошибок.
+
+Запуск: python benchmarks/loggen.py OUTPUT --size 100M [--match-ratio 0.01] [--burstiness 0.5]
+"""
+from datetime import timedelta
+from pathlib import Path
+import argparse
+import math
+import random
+import re
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import cs_logchecker  # noqa: E402
+
+# Строка-совпадение содержит MATCH_LEVEL, остальные - один из OTHER_LEVELS
+MATCH_LEVEL = "ERROR"
+OTHER_LEVELS = ("INFO", "INFO", "INFO", "DEBUG", "WARN")
+COMPONENTS = ("http", "db", "auth", "cache", "scheduler", "worker", "api", "storage")
+WORDS = ("request", "user", "session", "timeout", "connection", "retry", "queue", "commit",
+         "latency", "handler", "payload", "token", "upstream", "shard", "record", "status")
+# Размер блока записи в файл
+WRITE_BLOCK = 4 * 1024 * 1024
+# Количество заранее сгенерированных строк (без времени) каждого вида
+TAIL_POOL_BITS = 12
+TAIL_POOL = 1 << TAIL_POOL_BITS
+
+SIZE_SUFFIXES = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(value: str) -> int:
+    """Размер в байтах из строки вида 512K, 10M, 20G или числа"""
+    value = value.strip().upper().removesuffix("B")
+    if value and value[-1] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def generate_log(path: Path, size: int, match_ratio: float = 0.01, line_length: int = 120,
+                 line_sigma: float = 0.5, burstiness: float = 0.0, burst_length: int = 200,
+                 start_time: cs_logchecker.CustomDateTime = None, step_ms: float = 5.0,
+                 format_logtime: str = cs_logchecker.DEFAULT_FORMAT_LOGTIME,
+                 seed: int = 0, append: bool = False) -> dict:
+    """
+    Записывает (или дописывает) в path около size байт строк лога.
+
+    Args:
+        match_ratio: Доля строк уровня MATCH_LEVEL
+        line_length: Средняя длина строки, байт
+        line_sigma: Параметр sigma логнормального распределения длины
+        burstiness: Доля совпадений, идущих пачками по burst_length строк (0 - равномерно)
+        start_time: Время первой строки (по умолчанию 2026-01-01)
+        step_ms: Средний интервал между строками, мс (равномерно от 0 до 2 * step_ms)
+
+    Returns:
+        Сводка: количество строк и совпадений, записанный объем, время последней строки
+    """
+    rng = random.Random(seed)
+    start_time = start_time or cs_logchecker.CustomDateTime(2026, 1, 1)
+    # Вероятность одиночного совпадения и начала пачки на строку
+    single_ratio = match_ratio * (1 - burstiness)
+    burst_start_ratio = match_ratio * burstiness / max(1, burst_length)
+    step_us = step_ms * 1000
+
+    # Строки без времени генерируются заранее: на каждую строку остаются
+    # только форматирование времени и выбор готового "хвоста"
+    time_width = len(start_time.custom_strftime(format_logtime)) + 1
+    mu = math.log(max(1, line_length)) - line_sigma ** 2 / 2
+    text = " ".join(rng.choice(WORDS) for _ in range(1 << 16))
+
+    def make_tails(levels: tuple) -> list:
+        tails = []
+        for _ in range(TAIL_POOL):
+            head = f"{rng.choice(levels)} [{rng.choice(COMPONENTS)}] "
+            body_length = max(8, int(rng.lognormvariate(mu, line_sigma)) - time_width - len(head) - 1)
+            offset = rng.randrange(len(text) - body_length)
+            tails.append(f"{head}{text[offset:offset + body_length]}\n")
+        return tails
+
+    match_tails = make_tails((MATCH_LEVEL,))
+    other_tails = make_tails(OTHER_LEVELS)
+
+    # Время строки = base + elapsed_us; части формата до и после %[N]f
+    # форматируются один раз на каждую секунду
+    base = start_time.replace(microsecond=0)
+    elapsed_us = start_time.microsecond
+    fraction = list(re.finditer(r"%(\d*)f", format_logtime))
+    if len(fraction) == 1:
+        before, after = format_logtime[:fraction[0].start()], format_logtime[fraction[0].end():]
+        digits = int(fraction[0].group(1) or 6)
+    cached_second = -1
+    time_prefix = time_suffix = ""
+
+    lines = matches = written = 0
+    burst_left = 0
+    block = []
+    block_size = 0
+    with open(path, "a" if append else "w", encoding="utf-8") as output:
+        while written + block_size < size:
+            elapsed_us += int(step_us * 2 * rng.random())
+            if burst_left:
+                burst_left -= 1
+                match = True
+            else:
+                chance = rng.random()
+                match = chance < single_ratio
+                if not match and chance < single_ratio + burst_start_ratio:
+                    burst_left = burst_length - 1
+                    match = True
+
+            tail = (match_tails if match else other_tails)[rng.getrandbits(TAIL_POOL_BITS)]
+            second, micro = divmod(elapsed_us, 1000000)
+            if len(fraction) != 1:
+                time_str = (base + timedelta(microseconds=elapsed_us)).custom_strftime(format_logtime)
+            else:
+                if second != cached_second:
+                    second_time = base + timedelta(seconds=second)
+                    time_prefix = second_time.custom_strftime(before)
+                    time_suffix = second_time.custom_strftime(after)
+                    cached_second = second
+                time_str = f"{time_prefix}{micro:06d}"[:len(time_prefix) + digits] + time_suffix
+            line = f"{time_str} {tail}"
+            block.append(line)
+            block_size += len(line)
+            lines += 1
+            matches += match
+            if block_size >= WRITE_BLOCK:
+                output.write("".join(block))
+                written += block_size
+                block.clear()
+                block_size = 0
+        output.write("".join(block))
+        written += block_size
+
+    return {"lines": lines, "matches": matches, "bytes": written,
+            "last_time": base + timedelta(microseconds=elapsed_us)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетических лог-файлов")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--size", type=parse_size, default=parse_size("100M"),
+                        help="Размер: 10M ... 20G. Default: 100M")
+    parser.add_argument("--match-ratio", type=float, default=0.01)
+    parser.add_argument("--line-length", type=int, default=120)
+    parser.add_argument("--line-sigma", type=float, default=0.5)
+    parser.add_argument("--burstiness", type=float, default=0.0)
+    parser.add_argument("--burst-length", type=int, default=200)
+    parser.add_argument("--format-logtime", default=cs_logchecker.DEFAULT_FORMAT_LOGTIME)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--append", action="store_true",
+                        help="Дописать в существующий файл, продолжив время с его последней строки")
+    args = parser.parse_args()
+
+    start_time = None
+    if args.append and args.output.exists():
+        cs_logchecker.FORMAT_LOGTIME = args.format_logtime
+        start_time = cs_logchecker.try_parse_log_time(cs_logchecker.get_last_line(args.output))
+
+    summary = generate_log(args.output, args.size, args.match_ratio, args.line_length, args.line_sigma,
+                           args.burstiness, args.burst_length, start_time,
+                           format_logtime=args.format_logtime, seed=args.seed, append=args.append)
+    print(f"{args.output}: {summary['bytes']:,} bytes, {summary['lines']:,} lines, "
+          f"{summary['matches']:,} matches, last time {summary['last_time']}")
+
+
+if __name__ == "__main__":
+    main()
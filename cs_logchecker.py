@@ -1,12 +1,56 @@
 from datetime import datetime, timedelta
 from pathlib import Path, PurePosixPath
 from collections import deque
+from typing import Iterator, NamedTuple, Optional
+from functools import lru_cache
 import argparse
 import re
 import os
 import sys
 import tempfile
+import json
+import configparser
+import mmap
 import shutil
+import signal
+import select
+import asyncio
+import time
+import cProfile
+import pstats
+import tracemalloc
+import sqlite3
+from contextlib import contextmanager
+import glob
+import gzip
+import bz2
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+try:
+    import lzma
+except ImportError:  # Python без поддержки lzma
+    lzma = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
 
 class CustomDateTime(datetime):
     """Расширенный datetime с поддержкой %[N]f для микросекунд"""
@@ -37,16 +81,1052 @@ class CustomDateTime(datetime):
     def custom_strptime(cls, date_string: str, format_str: str) -> 'CustomDateTime':
         """
         Расширенная версия strptime с поддержкой формата %[N]f для обработки микросекунд.
-        Убирает числовое значение перед символом 'f' и передает дальше стандартной обработке.
+        Формат компилируется один раз и кешируется (см. LogTimeParser).
         """
-        # Регулярка для замены всех вариантов %[N]f на %f
-        cleaned_format = re.sub(r"%\d*f", "%f", format_str)
-        
-        # Используем стандартную обработку datetime.strptime
-        dt = datetime.strptime(date_string, cleaned_format)
-        
-        # Возвращаем объект нашего класса
-        return cls(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, dt.microsecond)
+        return get_time_parser(format_str).parse(date_string)
+
+class LogTimeParser:
+    """
+    Скомпилированный разборщик времени для формата с поддержкой %[N]f.
+    Форматы из числовых директив (%Y %m %d %H %M %S %y %[N]f) разбираются
+    предкомпилированным регулярным выражением, а форматы фиксированной ширины
+    (например, DEFAULT_FORMAT_LOGTIME) - срезами строки по позициям.
+    Строки, не подходящие под выражение, и форматы с локалезависимыми
+    директивами (%b, %p, %z, ...) разбираются datetime.strptime.
+    """
+
+    # Директива -> (ширина или None для переменной, индекс аргумента datetime)
+    DIRECTIVES = {
+        "Y": (4, 0),
+        "y": (2, 0),
+        "m": (2, 1),
+        "d": (2, 2),
+        "H": (2, 3),
+        "M": (2, 4),
+        "S": (2, 5),
+        "f": (None, 6),
+    }
+    # Значения аргументов datetime по умолчанию (как у strptime)
+    DEFAULTS = (1900, 1, 1, 0, 0, 0, 0)
+
+    def __init__(self, format_str: str):
+        self.format_str = format_str
+        # Вариант формата для datetime.strptime: %[N]f -> %f
+        self.strptime_format = re.sub(r"%\d*f", "%f", format_str)
+        # Количество разделенных пробелами сегментов временной метки в строке лога
+        self.segments = len(format_str.split())
+        # (индекс аргумента datetime, множитель) для групп регулярного выражения
+        self.groups = []
+        # (индекс аргумента datetime, начало, конец, множитель) для формата фиксированной ширины
+        self.slices = []
+        self.width = 0
+        self.year2 = False
+        self.regex = None
+        self.fixed_regex = None
+        self._compile(format_str)
+
+    def _compile(self, format_str: str) -> None:
+        """Компиляция формата; при неподдерживаемых директивах остается только strptime"""
+        parts = []
+        fixed_parts = []
+        fixed = True
+        pos = 0
+        seen = set()
+        for match in re.finditer(r"%(\d*)(.)", format_str):
+            literal = format_str[pos:match.start()]
+            parts.append(self._literal(literal))
+            fixed_parts.append(re.escape(literal))
+            self.width += len(literal)
+            pos = match.end()
+            digits, directive = match.groups()
+            if directive == "%" and not digits:
+                parts.append("%")
+                fixed_parts.append("%")
+                self.width += 1
+                continue
+            if directive not in self.DIRECTIVES or (digits and directive != "f"):
+                self.width = 0
+                return
+            width, index = self.DIRECTIVES[directive]
+            if index in seen:
+                self.width = 0
+                return
+            seen.add(index)
+            self.year2 = self.year2 or directive == "y"
+            if digits:
+                width = int(digits)
+            # %[N]f: N цифр дробной части секунды -> микросекунды
+            multiplier = 10 ** (6 - width) if directive == "f" and width and width < 6 else 1
+            if width is None:
+                parts.append(r"(\d{1,6})")
+                fixed = False
+            else:
+                parts.append(rf"(\d{{{width}}})")
+                fixed_parts.append(rf"\d{{{width}}}")
+                self.slices.append((index, self.width, self.width + width, multiplier))
+                self.width += width
+            self.groups.append((index, multiplier))
+        literal = format_str[pos:]
+        parts.append(self._literal(literal))
+        fixed_parts.append(re.escape(literal))
+        self.width += len(literal)
+
+        self.regex = re.compile("".join(parts))
+        # Для %[N]f, где N > 6, берутся только первые 6 цифр (срезы не применимы)
+        if fixed and all(end - start <= 6 or index != 6 for index, start, end, _ in self.slices):
+            self.fixed_regex = re.compile("".join(fixed_parts))
+        else:
+            self.width = 0
+
+    @staticmethod
+    def _literal(text: str) -> str:
+        # strptime сопоставляет пробельные символы формата с \s+
+        return r"\s+".join(re.escape(part) for part in re.split(r"\s+", text))
+
+    def _build(self, args: list) -> CustomDateTime:
+        if self.year2:
+            args[0] += 1900 if args[0] >= 69 else 2000
+        return CustomDateTime(*args)
+
+    def parse(self, time_str: str) -> CustomDateTime:
+        """Разбор строки времени; ValueError при несоответствии формату"""
+        match = self.regex.fullmatch(time_str) if self.regex else None
+        if match is None:
+            dt = datetime.strptime(time_str, self.strptime_format)
+            return CustomDateTime(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second, dt.microsecond)
+
+        args = list(self.DEFAULTS)
+        for (index, multiplier), value in zip(self.groups, match.groups()):
+            if index == 6:
+                value = value[:6].ljust(6, "0") if multiplier == 1 else value
+            args[index] = int(value) * multiplier
+        return self._build(args)
+
+    def split(self, log_line: str) -> str:
+        """
+        Выделяет из строки лога подстроку с временной меткой
+        (первые сегменты строки по количеству сегментов формата)
+        """
+        parts = log_line.split(maxsplit=self.segments)
+        if len(parts) < self.segments:
+            raise ValueError(f"Недостаточно сегментов в строке лога. Ожидается {self.segments}, получено {len(parts)}")
+        return ' '.join(parts[:self.segments])
+
+    def parse_line(self, log_line: str) -> CustomDateTime:
+        """Временная метка из начала строки лога; ValueError, если ее нет"""
+        width = self.width
+        if self.fixed_regex is not None and self.fixed_regex.fullmatch(log_line, 0, width) \
+                and (len(log_line) == width or log_line[width].isspace()):
+            args = list(self.DEFAULTS)
+            for index, start, end, multiplier in self.slices:
+                args[index] = int(log_line[start:end]) * multiplier
+            return self._build(args)
+        return self.parse(self.split(log_line))
+
+    def try_parse_line(self, log_line: str) -> Optional[CustomDateTime]:
+        """Как parse_line, но для строк без временной метки возвращает None"""
+        try:
+            return self.parse_line(log_line)
+        except ValueError:
+            return None
+
+    def parse_lines(self, log_lines) -> list:
+        """
+        Пакетный разбор: временные метки строк (None для строк без метки).
+        Для форматов фиксированной ширины разбор выполняется без вызова
+        методов на каждую строку.
+        """
+        width = self.width
+        fullmatch = self.fixed_regex.fullmatch if self.fixed_regex is not None else None
+        slices = self.slices
+        defaults = self.DEFAULTS
+        result = []
+        for log_line in log_lines:
+            if fullmatch is not None and fullmatch(log_line, 0, width) \
+                    and (len(log_line) == width or log_line[width].isspace()):
+                args = list(defaults)
+                for index, start, end, multiplier in slices:
+                    args[index] = int(log_line[start:end]) * multiplier
+                try:
+                    result.append(self._build(args))
+                except ValueError:
+                    result.append(None)
+                continue
+            try:
+                result.append(self.parse(self.split(log_line)))
+            except ValueError:
+                result.append(None)
+        return result
+
+@lru_cache(maxsize=32)
+def get_time_parser(format_str: str) -> LogTimeParser:
+    """Скомпилированный разборщик для формата (кешируется)"""
+    return LogTimeParser(format_str)
+
+class LogPosition(NamedTuple):
+    """Позиция, до которой лог-файл был обработан в прошлый запуск"""
+    dev: int = 0
+    ino: int = 0
+    size: int = 0
+    offset: int = 0
+
+class ScanSettings(NamedTuple):
+    """
+    Параметры чтения лог-файла, передаваемые функциям сканирования.
+    LogChecker задает их сам, режимы командной строки - через cli_scan_settings().
+    """
+    format_logtime: str
+    encoding: str
+    full_scan: bool
+    bisect: bool
+    scan_workers: int
+    # Минимальный объем чтения (в байтах) для параллельного чтения
+    parallel_threshold: int
+    # Максимальный размер многострочной записи; 0 - построчный режим
+    max_record_size: int
+    # Вывод сообщений INFO о ходе чтения в stderr (LogChecker по умолчанию не выводит)
+    verbose: bool = True
+
+    @property
+    def parser(self) -> LogTimeParser:
+        return get_time_parser(self.format_logtime)
+
+class Rule:
+    """Правило обработки лог-файла: шаблон, лимит строк, выходной файл и запись в lasttime"""
+
+    def __init__(self, additional_name: str, pattern: str, limit_lines: int, path_to_body: Optional[Path],
+                 path_to_logfile: Path, csv_delimiter: str, format_logtime: str, top_k: int = 0):
+        """
+        :param path_to_body: Файл отчета (None - отчет не записывается, как в LogChecker)
+        :param csv_delimiter: Разделитель в префиксе записи lasttime
+        :param format_logtime: Формат временной метки строк лога
+        :param top_k: Агрегировать строки по сигнатурам (--aggregate); 0 - без агрегации
+        """
+        self.additional_name = additional_name
+        self.pattern = pattern
+        self.regex = re.compile(pattern)
+        self.limit_lines = limit_lines
+        self.path_to_body = path_to_body
+        self.path_to_logfile = path_to_logfile
+        self.csv_delimiter = csv_delimiter
+        self.lasttime_prefix = f"{path_to_logfile}{additional_name}{csv_delimiter}"
+        self.parser = get_time_parser(format_logtime)
+        self.last_time = CustomDateTime.min
+        self.position = LogPosition()
+        self.start_offset = 0
+        # Чтение продолжено с сохраненной позиции: все строки после start_offset новые
+        self.resumed = False
+        self.lines = deque(maxlen=limit_lines or None)
+        self.total_lines = 0
+        self.cutoff_passed = False
+        # Агрегация по сигнатурам (--aggregate): 0 - отключена
+        self.top_k = top_k
+        self.signatures = SignatureCounter(top_k, self.parser.segments) if top_k else None
+
+    def add_line(self, line: str) -> None:
+        """Учитывает подходящую под шаблон строку с отсечением по времени last_time"""
+        # Лог упорядочен по времени: после первой новой строки
+        # временные метки остальных строк можно не разбирать
+        if not self.cutoff_passed:
+            log_time = self.parser.try_parse_line(line)
+            if log_time is None or log_time <= self.last_time:
+                return
+            self.cutoff_passed = True
+        self.total_lines += 1
+        self.lines.append(line)
+        if self.signatures is not None:
+            self.signatures.add(line)
+
+    def merge_chunk(self, passed: bool, total_cut: int, total: int, lines: list) -> None:
+        """
+        Добавляет результат scan_chunk для очередной части лог-файла
+        (части добавляются в порядке следования в файле)
+        """
+        if not self.cutoff_passed:
+            if not passed:
+                return
+            # Строки части после отсечения - это ее последние total_cut строк
+            total = total_cut
+            lines = lines[len(lines) - min(len(lines), total_cut):]
+            self.cutoff_passed = True
+        self.total_lines += total
+        self.lines.extend(lines)
+
+    def reset(self) -> None:
+        """Сброс результатов чтения перед повторной проверкой лог-файла"""
+        self.start_offset = 0
+        self.resumed = False
+        self.cutoff_passed = False
+        self.clear_lines()
+
+    def found_last_time(self) -> CustomDateTime:
+        """Временная метка последней найденной строки (last_time, если строк нет)"""
+        if self.lines:
+            # Последняя найденная строка может быть без временной метки (строка-продолжение)
+            return self.parser.try_parse_line(self.lines[-1]) or self.last_time
+        return self.last_time
+
+    def flush_report(self, position: LogPosition) -> list:
+        """
+        Запись отчета по найденным строкам (если они есть) и сброс строк
+        :param position: Достигнутая позиция в лог-файле
+        :return: Новые значения записи lasttime
+        """
+        if self.lines:
+            self.last_time = self.found_last_time()
+            write_report(self.lines, self.total_lines, self)
+            self.clear_lines()
+        return format_lasttime_entry(self.last_time, position)
+
+    def clear_lines(self) -> None:
+        """Сброс накопленных строк после записи отчета"""
+        self.lines.clear()
+        self.total_lines = 0
+        if self.signatures is not None:
+            # Новый объект: сигнатуры прежнего результата остаются у вызывающего
+            self.signatures = SignatureCounter(self.top_k, self.parser.segments)
+
+    def for_logfile(self, path_to_logfile: Path) -> 'Rule':
+        """Копия правила для другого лог-файла (--batch)"""
+        return Rule(self.additional_name, self.pattern, self.limit_lines, self.path_to_body, path_to_logfile,
+                    self.csv_delimiter, self.parser.format_str, self.top_k)
+
+class SignatureCounter:
+    """
+    Подсчет новых строк по сигнатурам (--aggregate): из строки удаляется
+    временная метка (первые segments сегментов), UUID, шестнадцатеричные
+    значения и числа заменяются на <uuid>, <hex>, <num>.
+
+    Память ограничена алгоритмом Space-Saving с пакетным вытеснением:
+    хранится не более 2 * capacity сигнатур, при переполнении остаются
+    capacity самых частых. Счетчик новой сигнатуры начинается с floor -
+    наибольшего вытесненного счетчика, поэтому счетчик может быть завышен
+    не более чем на свою погрешность error <= floor <= N / capacity.
+    """
+
+    def __init__(self, capacity: int, segments: int):
+        self.capacity = capacity
+        # Количество разделенных пробелами сегментов временной метки в строке лога
+        self.segments = segments
+        self.floor = 0
+        # Сигнатура -> [счетчик, погрешность, первое появление, последнее появление, пример строки]
+        self.entries = {}
+
+    def add(self, line: str) -> None:
+        segments = self.segments
+        parts = line.split(maxsplit=segments)
+        seen = " ".join(parts[:segments])
+        text = parts[segments].rstrip() if len(parts) > segments else ""
+        signature = SIGNATURE_NUMBER_RE.sub("<num>", SIGNATURE_HEX_RE.sub("<hex>", SIGNATURE_UUID_RE.sub("<uuid>", text)))
+        entry = self.entries.get(signature)
+        if entry is not None:
+            entry[0] += 1
+            entry[3] = seen
+            return
+        if len(self.entries) >= 2 * self.capacity:
+            self._evict()
+        self.entries[signature] = [self.floor + 1, self.floor, seen, seen, line.rstrip("\n")]
+
+    def _evict(self) -> None:
+        ranked = sorted(self.entries.items(), key=lambda item: item[1][0], reverse=True)
+        self.floor = max(self.floor, ranked[self.capacity][1][0])
+        self.entries = dict(ranked[:self.capacity])
+
+    def top(self, limit: int = 0) -> list:
+        """
+        Самые частые сигнатуры
+        :param limit: Количество сигнатур (0 - все)
+        :return: Список (сигнатура, счетчик, погрешность, первое появление, последнее появление, пример)
+        """
+        ranked = sorted(self.entries.items(), key=lambda item: item[1][0], reverse=True)
+        return [(signature, *entry) for signature, entry in ranked[:limit or None]]
+
+class RunStats:
+    """
+    Статистика запуска (--stats): время этапов (по часам и процессорное,
+    включая процессы пула), объем прочитанных данных, количество
+    просмотренных, найденных и пропущенных в отчете строк.
+    Пока enabled == False, этапы не замеряются, а строки не подсчитываются.
+    """
+    COUNTERS = ("bytes_read", "lines_scanned", "lines_matched", "lines_skipped")
+
+    def __init__(self):
+        self.enabled = False
+        self.started = time.time()
+        # Этап -> [время по часам, процессорное время]
+        self.stages = {}
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    @staticmethod
+    def cpu_time() -> float:
+        """Процессорное время процесса и завершенных дочерних процессов"""
+        if resource is None:
+            return time.process_time()
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return time.process_time() + usage.ru_utime + usage.ru_stime
+
+    @staticmethod
+    def peak_rss() -> int:
+        """Пиковый размер резидентной памяти процесса, байт"""
+        if resource is None:
+            return 0
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux возвращает килобайты, macOS - байты
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        wall, cpu = time.perf_counter(), self.cpu_time()
+        try:
+            yield
+        finally:
+            totals = self.stages.setdefault(name, [0.0, 0.0])
+            totals[0] += time.perf_counter() - wall
+            totals[1] += self.cpu_time() - cpu
+
+    def count_data(self, data) -> None:
+        """Учет прочитанного блока лог-файла"""
+        self.counters["bytes_read"] += len(data)
+        self.counters["lines_scanned"] += data.count(b"\n")
+
+    def take(self) -> dict:
+        """Счетчики с обнулением (для передачи из процесса пула)"""
+        counters = self.counters
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        return counters
+
+    def merge(self, counters: dict) -> None:
+        for name, value in counters.items():
+            self.counters[name] += value
+
+class TimedStateStore:
+    """Хранилище lasttime с замером времени чтения и записи (этапы state_read, state_write)"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def read(self, keys: list) -> dict:
+        with STATS.stage("state_read"):
+            return self.store.read(keys)
+
+    def write(self, entries: dict) -> None:
+        with STATS.stage("state_write"):
+            self.store.write(entries)
+
+class LogCheckerError(Exception):
+    """Ошибка проверки лог-файла; в main() выводится как ERROR с кодом завершения 1"""
+
+class CheckResult(NamedTuple):
+    """Результат LogChecker.check()"""
+    path_to_logfile: Path
+    additional_name: str
+    # Последние limit_lines новых строк
+    lines: list
+    # Общее количество новых строк
+    total_lines: int
+    # Временная метка последней новой строки (или прежняя, если новых строк нет)
+    last_time: CustomDateTime
+    position: LogPosition
+    # Сигнатуры новых строк (при top_k > 0)
+    signatures: Optional[SignatureCounter] = None
+
+class LogChecker:
+    """
+    Проверка лог-файла по шаблону для встраивания в другой процесс:
+    без запуска интерпретатора на каждую проверку и без sys.exit.
+    Скомпилированные шаблон, префильтр и разборщик времени создаются один раз
+    и используются при каждом вызове check(). Состояние (время и позиция)
+    хранится в store (CsvStateStore/SqliteStateStore), а если store не задан,
+    то в самом объекте. Ошибки передаются исключением LogCheckerError.
+
+    Параметры чтения передаются функциям сканирования в ScanSettings, глобальные
+    переменные модуля не используются, поэтому разные объекты LogChecker
+    можно проверять одновременно из нескольких потоков.
+
+    Из режимов командной строки через LogChecker работает только --stream;
+    остальные режимы используют глобальные переменные, заданные init_global.
+    """
+    __slots__ = ("rule", "prefilter", "settings", "store")
+
+    def __init__(self, path_to_logfile, pattern: Optional[str] = None, limit_lines: int = 20,
+                 format_logtime: Optional[str] = None, additional_name: str = "", store=None,
+                 full_scan: bool = False, bisect: bool = True, scan_workers: int = 1, top_k: int = 0,
+                 max_record_size: int = 0, csv_delimiter: Optional[str] = None, encoding: str = "utf-8",
+                 parallel_threshold: Optional[int] = None, verbose: bool = False):
+        """
+        :param path_to_logfile: Путь к лог-файлу
+        :param pattern: Регулярное выражение (по умолчанию DEFAULT_PATTERN)
+        :param limit_lines: Количество последних строк в результате (0 - все)
+        :param format_logtime: Формат временной метки (по умолчанию DEFAULT_FORMAT_LOGTIME)
+        :param additional_name: Суфикс записи состояния
+        :param store: Хранилище состояния; None - хранить в объекте. Разделитель
+                      хранилища должен совпадать с csv_delimiter
+        :param full_scan: Игнорировать сохраненную позицию
+        :param bisect: Искать начало новых записей двоичным поиском по времени
+        :param scan_workers: Количество процессов для чтения большого лог-файла
+        :param top_k: Агрегировать строки по сигнатурам, храня до 2 * top_k сигнатур (0 - без агрегации)
+        :param max_record_size: Проверять многострочные записи размером до max_record_size
+                                символов вместо строк (0 - построчно)
+        :param csv_delimiter: Разделитель в записи состояния (по умолчанию DEFAULT_CSV_DELIMITER)
+        :param encoding: Кодировка лог-файла
+        :param parallel_threshold: Минимальный объем чтения в байтах для параллельного чтения
+                                   (по умолчанию DEFAULT_PARALLEL_THRESHOLD_MB)
+        :param verbose: Выводить сообщения INFO о ходе чтения в stderr
+        """
+        pattern = DEFAULT_PATTERN if pattern is None else pattern
+        format_logtime = format_logtime or DEFAULT_FORMAT_LOGTIME
+        try:
+            self.rule = Rule(additional_name, pattern, limit_lines, None, Path(path_to_logfile).resolve(),
+                             csv_delimiter or DEFAULT_CSV_DELIMITER, format_logtime, top_k)
+        except re.error as e:
+            raise LogCheckerError(f"Ошибка в регулярном выражении '{pattern}': {e}") from e
+        # Состояние как у отсутствующей записи в хранилище
+        self.rule.last_time, self.rule.position = parse_lasttime_fields([])
+        self.prefilter = build_prefilter([pattern], encoding)
+        if parallel_threshold is None:
+            parallel_threshold = DEFAULT_PARALLEL_THRESHOLD_MB * 1024 * 1024
+        self.settings = ScanSettings(format_logtime, encoding, full_scan, bisect, scan_workers,
+                                     parallel_threshold, max_record_size, verbose)
+        self.store = store
+
+    def check(self, commit: bool = True) -> CheckResult:
+        """
+        Проверка строк, дописанных с момента последнего сохраненного состояния
+        :param commit: Сохранить новое состояние сразу; при False состояние
+                       сохраняется вызовом commit() после обработки результата
+        """
+        rule = self.rule
+        if self.store is not None:
+            fields = self.store.read([rule.lasttime_prefix])[rule.lasttime_prefix]
+            rule.last_time, rule.position = parse_lasttime_fields(fields)
+        rule.reset()
+
+        try:
+            position = scan_rules([rule], self.settings, self.prefilter)
+        except (RuntimeError, OSError, ValueError) as e:
+            raise LogCheckerError(f"{rule.path_to_logfile}: {e}") from e
+
+        result = CheckResult(rule.path_to_logfile, rule.additional_name, list(rule.lines),
+                             rule.total_lines, rule.found_last_time(), position, rule.signatures)
+        if commit:
+            self.commit(result)
+        return result
+
+    def commit(self, result: CheckResult) -> None:
+        """Сохранение состояния после обработки результата check()"""
+        self.rule.last_time, self.rule.position = result.last_time, result.position
+        if self.store is not None:
+            self.store.write({self.rule.lasttime_prefix: format_lasttime_entry(result.last_time, result.position)})
+
+@contextmanager
+def locked(path: Path):
+    """Монопольная блокировка fcntl файла path через <path>.lock (без fcntl - без блокировки)"""
+    if fcntl is None:
+        yield
+        return
+    with open(path.with_name(path.name + ".lock"), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+class CsvStateStore:
+    """
+    Хранилище lasttime в CSV-файле (формат как у lasttime.csv).
+    Запись выполняется под блокировкой fcntl: файл перечитывается,
+    обновляются только переданные записи, результат записывается
+    во временный файл и атомарно переименовывается.
+    """
+
+    def __init__(self, path: Path, csv_delimiter: Optional[str] = None, encoding: str = "utf-8"):
+        """
+        :param path: Путь к CSV-файлу
+        :param csv_delimiter: Разделитель в записях (по умолчанию DEFAULT_CSV_DELIMITER);
+                              должен совпадать с разделителем в ключах записей
+        :param encoding: Кодировка файла
+        """
+        self.path = path
+        self.csv_delimiter = csv_delimiter or DEFAULT_CSV_DELIMITER
+        self.encoding = encoding
+        path.touch(exist_ok=True)
+
+    def _load(self) -> tuple:
+        """Строки файла и индекс: ключ записи -> номер строки"""
+        try:
+            with self.path.open("r", encoding=self.encoding) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+        index = {}
+        for number, line in enumerate(lines):
+            key, _ = self._split_line(line)
+            if key is not None:
+                index[key] = number
+        return lines, index
+
+    def _split_line(self, line: str) -> tuple:
+        """
+        Разделяет строку на ключ (<путь><суфикс><разделитель>) и значения.
+        Значения: время и 4 числа позиции, либо только время (старый формат).
+        """
+        delimiter = self.csv_delimiter
+        body = line.rstrip("\r\n")
+        parts = body.rsplit(delimiter, 5)
+        if len(parts) == 6 and all(part.isdigit() for part in parts[2:]):
+            count = 5
+        else:
+            parts = body.rsplit(delimiter, 1)
+            count = 1
+        if len(parts) <= count:
+            return None, []
+        return delimiter.join(parts[:-count]) + delimiter, parts[-count:]
+
+    def read(self, keys: list) -> dict:
+        """Значения записей (пустой список, если записи нет)"""
+        lines, index = self._load()
+        return {key: self._split_line(lines[index[key]])[1] if key in index else [] for key in keys}
+
+    def write(self, entries: dict) -> None:
+        """Обновление записей: ключ -> значения"""
+        with locked(self.path):
+            lines, index = self._load()
+            for key, fields in entries.items():
+                line = f"{key}{self.csv_delimiter.join(fields)}\n"
+                if key in index:
+                    lines[index[key]] = line
+                else:
+                    index[key] = len(lines)
+                    lines.append(line)
+
+            with tempfile.NamedTemporaryFile("w", encoding=self.encoding, dir=self.path.parent,
+                                             prefix=f".{self.path.name}.", delete=False) as tmp_file:
+                tmp_file.writelines(lines)
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_file.name, self.path)
+
+class ReportSink:
+    """
+    Запись отчетов в выходной файл (PATH_TO_BODY) с ротацией.
+    Отчет дописывается одним вызовом write с fsync; затем во временный
+    файл записывается и атомарно переименовывается сопутствующий файл
+    <выходной файл>.offset (JSON): st_ino и размер выходного файла после
+    отчета, смещение начала последнего отчета, количество отчетов в файле
+    и сквозной номер отчета (sequence). Потребитель читает выходной файл
+    только до size из .offset, поэтому не видит недописанный отчет, а по
+    своему сохраненному смещению и st_ino - только новые отчеты.
+    Перед записью файл ротируется (<файл>.1, <файл>.2, ...), если отчет
+    превысит max_size байт или в файле уже max_reports отчетов.
+    .offset описывает только текущий файл: если его st_ino отличается от
+    сохраненного потребителем, потребитель находит файл со своим st_ino среди
+    <файл>.N, дочитывает его от своего смещения и переходит к более новым
+    (<файл>.N-1, ..., <файл>) с начала.
+    Запись выполняется под блокировкой fcntl (<выходной файл>.lock).
+    """
+
+    def __init__(self, max_size: int = 0, max_reports: int = 0, backups: Optional[int] = None):
+        """
+        :param max_size: Максимальный размер выходного файла, байт (0 - без ограничения)
+        :param max_reports: Максимальное количество отчетов в выходном файле (0 - без ограничения)
+        :param backups: Количество хранимых ротированных файлов (по умолчанию DEFAULT_REPORT_BACKUPS)
+        """
+        self.max_size = max_size
+        self.max_reports = max_reports
+        self.backups = DEFAULT_REPORT_BACKUPS if backups is None else backups
+
+    @staticmethod
+    def offset_path(path: Path) -> Path:
+        return path.with_name(path.name + ".offset")
+
+    def append(self, path: Path, data: str) -> None:
+        raw = data.encode(ENCODING)
+        with locked(path):
+            state = self._load_state(path)
+            size = path.stat().st_size if path.exists() else 0
+            if size and ((self.max_size and size + len(raw) > self.max_size)
+                         or (self.max_reports and state.get("reports", 0) >= self.max_reports)):
+                self._rotate(path)
+                size = 0
+                state["reports"] = 0
+                state["rotations"] = state.get("rotations", 0) + 1
+
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                view = memoryview(raw)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+                stat = os.fstat(fd)
+            finally:
+                os.close(fd)
+
+            state.update(inode=stat.st_ino, size=stat.st_size, last_report_offset=stat.st_size - len(raw),
+                         reports=state.get("reports", 0) + 1, sequence=state.get("sequence", 0) + 1,
+                         rotations=state.get("rotations", 0))
+            offset_path = self.offset_path(path)
+            with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent,
+                                             prefix=f".{offset_path.name}.", delete=False) as tmp_file:
+                tmp_file.write(json.dumps(state) + "\n")
+                tmp_file.flush()
+                os.fsync(tmp_file.fileno())
+            os.replace(tmp_file.name, offset_path)
+
+    def _load_state(self, path: Path) -> dict:
+        """Состояние из .offset; если выходной файл заменен или удален, счетчик отчетов в нем сбрасывается"""
+        try:
+            state = json.loads(self.offset_path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        try:
+            inode = path.stat().st_ino
+        except FileNotFoundError:
+            inode = None
+        if state.get("inode") != inode:
+            state["reports"] = 0
+        return state
+
+    def _rotate(self, path: Path) -> None:
+        """<файл>.N-1 -> <файл>.N, ..., <файл> -> <файл>.1; при backups == 0 файл удаляется"""
+        if self.backups <= 0:
+            path.unlink()
+            return
+        for number in range(self.backups - 1, 0, -1):
+            older = path.with_name(f"{path.name}.{number}")
+            if older.exists():
+                os.replace(older, path.with_name(f"{path.name}.{number + 1}"))
+        os.replace(path, path.with_name(f"{path.name}.1"))
+
+class SqliteStateStore:
+    """
+    Хранилище lasttime в SQLite: поиск записи по ключу без чтения всего файла,
+    атомарное обновление в транзакции, параллельные запуски ожидают блокировку.
+    Соединение открывается на время операции, поэтому объект можно
+    передавать в процессы пула (соединение не наследуется через fork).
+    """
+
+    # Ограничение SQLite на количество параметров запроса
+    BATCH_SIZE = 500
+
+    def __init__(self, path: Path, csv_delimiter: Optional[str] = None, encoding: str = "utf-8"):
+        """
+        :param path: Путь к файлу базы
+        :param csv_delimiter: Разделитель значений в записи (по умолчанию DEFAULT_CSV_DELIMITER)
+        :param encoding: Не используется (SQLite хранит текст в UTF-8),
+                         принимается для единого интерфейса с CsvStateStore
+        """
+        self.path = path
+        self.csv_delimiter = csv_delimiter or DEFAULT_CSV_DELIMITER
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(str(self.path), timeout=60, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS lasttime (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            yield connection
+        finally:
+            connection.close()
+
+    def read(self, keys: list) -> dict:
+        """Значения записей (пустой список, если записи нет)"""
+        entries = {key: [] for key in keys}
+        with self._connect() as connection:
+            for start in range(0, len(keys), self.BATCH_SIZE):
+                batch = keys[start:start + self.BATCH_SIZE]
+                rows = connection.execute(
+                    f"SELECT key, value FROM lasttime WHERE key IN ({','.join('?' * len(batch))})", batch)
+                for key, value in rows:
+                    entries[key] = value.split(self.csv_delimiter)
+        return entries
+
+    def write(self, entries: dict) -> None:
+        """Обновление записей: ключ -> значения"""
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO lasttime (key, value) VALUES (?, ?)",
+                    [(key, self.csv_delimiter.join(fields)) for key, fields in entries.items()])
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+class TimeIndex:
+    """
+    Разреженный индекс лог-файла "смещение строки -> временная метка" (--index).
+    Хранится в LOCAL_CACHE_PATH/index: первая строка - st_dev, st_ino и
+    проиндексированный размер лог-файла, далее строки <смещение>,<время>
+    примерно через каждые step байт. Индекс дополняется по мере роста файла
+    и строится заново при ротации (смена st_dev/st_ino) или усечении.
+    """
+
+    def __init__(self, path: Path, step: int):
+        self.path = path
+        self.step = step
+        self.identity = (0, 0)
+        self.size = 0
+        self.entries = []
+
+    def load(self) -> None:
+        try:
+            with self.path.open("r", encoding=ENCODING) as f:
+                dev, ino, size = (int(value) for value in f.readline().rstrip("\n").split(CSV_DELIMITER))
+                entries = []
+                for line in f:
+                    offset, time_str = line.rstrip("\n").split(CSV_DELIMITER)
+                    entries.append((int(offset), parse_time_string(time_str)))
+        except FileNotFoundError:
+            return
+        except ValueError:
+            print(f"WARNING: Индекс {self.path} поврежден и будет построен заново", file=sys.stderr)
+            return
+        self.identity, self.size, self.entries = (dev, ino), size, entries
+
+    def save(self) -> None:
+        with tempfile.NamedTemporaryFile("w", encoding=ENCODING, dir=self.path.parent,
+                                         prefix=f".{self.path.name}.", delete=False) as tmp_file:
+            tmp_file.write(CSV_DELIMITER.join(str(value) for value in (*self.identity, self.size)) + "\n")
+            for offset, log_time in self.entries:
+                tmp_file.write(f"{offset}{CSV_DELIMITER}{log_time.custom_strftime(DEFAULT_FORMAT_CSVTIME)}\n")
+        os.replace(tmp_file.name, self.path)
+
+    def update(self, src, stat: os.stat_result) -> None:
+        """Дополняет индекс до текущего размера лог-файла"""
+        if (stat.st_dev, stat.st_ino) != self.identity or stat.st_size < self.size:
+            if self.entries:
+                print("INFO: Лог-файл ротирован или усечен, индекс строится заново", file=sys.stderr)
+            self.identity, self.size, self.entries = (stat.st_dev, stat.st_ino), 0, []
+        elif stat.st_size == self.size:
+            return
+
+        # Начало файла в индекс не записывается: по умолчанию чтение идет с 0
+        pos = self.entries[-1][0] + self.step if self.entries else self.step
+        if pos < stat.st_size:
+            settings = cli_scan_settings()
+            with mmap.mmap(src.fileno(), stat.st_size, access=mmap.ACCESS_READ) as mm:
+                while pos < stat.st_size:
+                    pos = mm.find(b"\n", pos - 1) + 1
+                    log_time, line_start = read_next_log_time(mm, pos, stat.st_size, settings)
+                    if log_time is None:
+                        break
+                    self.entries.append((line_start, log_time))
+                    pos = line_start + self.step
+        self.size = stat.st_size
+        self.save()
+
+    def lookup(self, since: Optional[CustomDateTime], until: Optional[CustomDateTime], end: int) -> tuple:
+        """
+        Диапазон [start, stop) лог-файла, содержащий все строки
+        с метками из интервала [since, until]
+        """
+        start, stop = 0, end
+        for offset, log_time in self.entries:
+            if since is not None and log_time < since:
+                start = offset
+            elif until is not None and log_time > until:
+                stop = min(stop, offset)
+                break
+        return start, stop
+
+class LogFollower:
+    """
+    Слежение за дописыванием в лог-файл (--follow): файл остается открытым,
+    новые полные строки проверяются правилами по мере появления.
+    Ротация (смена st_dev/st_ino по пути) и усечение обрабатываются
+    повторным открытием файла.
+    """
+
+    def __init__(self, rules: list, settings: ScanSettings):
+        self.rules = rules
+        self.settings = settings
+        self.path = rules[0].path_to_logfile
+        self.prefilter = build_prefilter([rule.pattern for rule in rules], settings.encoding)
+        self.src = None
+        self.position = LogPosition()
+        # Позиция изменилась после последней записи в lasttime
+        self.dirty = False
+        # В файле остались полные строки сверх FOLLOW_READ_LIMIT, прочитанного за один опрос
+        self.pending = False
+
+    def open(self, resume: bool) -> None:
+        """Открывает лог-файл; resume - продолжить с сохраненных позиций правил"""
+        self.src = open(self.path, "rb")
+        stat = os.fstat(self.src.fileno())
+        for rule in self.rules:
+            rule.start_offset, rule.resumed = 0, False
+            if resume:
+                rule.start_offset, rule.resumed = get_start_offset(self.src, stat, rule.position, rule.last_time,
+                                                                   self.settings)
+                rule.cutoff_passed = rule.cutoff_passed or rule.resumed
+        start = min(rule.start_offset for rule in self.rules)
+        self.position = LogPosition(stat.st_dev, stat.st_ino, stat.st_size, start)
+        self.dirty = True
+
+    def close(self) -> None:
+        if self.src is not None:
+            self.src.close()
+            self.src = None
+
+    def poll(self) -> bool:
+        """Проверяет лог-файл и обрабатывает новые строки; True, если они были"""
+        stat = os.fstat(self.src.fileno())
+        if stat.st_size < self.position.offset:
+            print(f"INFO: {self.path}: лог-файл усечен, чтение с начала", file=sys.stderr)
+            self.position = self.position._replace(offset=0)
+            for rule in self.rules:
+                rule.start_offset = 0
+        got_data = self.read_new(stat)
+        if self.pending:
+            # Ротированный файл переоткрывается только после того, как он дочитан
+            return got_data
+
+        try:
+            path_stat = os.stat(self.path)
+        except FileNotFoundError:
+            # Между переименованием и созданием нового файла пути может не быть
+            return got_data
+        if (path_stat.st_dev, path_stat.st_ino) != (stat.st_dev, stat.st_ino):
+            # Старый файл уже дочитан выше
+            print(f"INFO: {self.path}: лог-файл ротирован, открывается новый файл", file=sys.stderr)
+            self.close()
+            self.open(resume=False)
+            got_data = self.read_new(os.fstat(self.src.fileno())) or got_data
+        return got_data
+
+    def read_new(self, stat: os.stat_result) -> bool:
+        """
+        Обрабатывает полные строки, дописанные после текущей позиции,
+        но не больше FOLLOW_READ_LIMIT байт за вызов (если в них есть конец строки)
+        """
+        data_end = find_data_end(self.src, stat.st_size)
+        end = data_end
+        if end - self.position.offset > FOLLOW_READ_LIMIT:
+            end = find_data_end(self.src, self.position.offset + FOLLOW_READ_LIMIT)
+            if end <= self.position.offset:
+                # Строка длиннее FOLLOW_READ_LIMIT
+                end = data_end
+        self.pending = end < data_end
+        if end <= self.position.offset:
+            return False
+        for line_start, line in iter_log_lines(self.src, self.position.offset, end, self.settings.encoding,
+                                               self.prefilter):
+            for rule in self.rules:
+                if line_start >= rule.start_offset and rule.regex.search(line):
+                    rule.add_line(line)
+        self.position = LogPosition(stat.st_dev, stat.st_ino, stat.st_size, end)
+        self.dirty = True
+        return True
+
+    def flush(self) -> dict:
+        """
+        Записывает накопленные отчеты правил
+        :return: Новые записи lasttime (префикс -> значения)
+        """
+        entries = {}
+        if not self.dirty:
+            return entries
+        for rule in self.rules:
+            entries[rule.lasttime_prefix] = rule.flush_report(self.position)
+        self.dirty = False
+        return entries
+
+class FollowEngine:
+    """
+    Обслуживание множества LogFollower одним циклом событий asyncio.
+    Для каждого лог-файла работает своя сопрограмма опроса с увеличивающейся
+    паузой (от FOLLOW_MIN_DELAY до poll_interval), чтение файлов выполняется
+    в небольшом пуле потоков, чтобы медленный диск не блокировал цикл.
+    Отчеты и lasttime записываются пакетом для всех файлов: раз в flush_interval
+    секунд или раньше, если суммарное число накопленных строк достигло
+    max_buffered_lines (опрос файлов при этом ждет окончания записи).
+    Сопрограммы не отменяются: по сигналу они завершаются после текущей
+    операции в пуле потоков, и только затем выполняются последний опрос и запись.
+    """
+
+    def __init__(self, followers: list, flush_interval: float, poll_interval: float,
+                 threads: int, max_buffered_lines: int):
+        self.followers = followers
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.max_buffered_lines = max_buffered_lines
+        self.executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="follow")
+        # Опрос и запись одного лог-файла не должны выполняться одновременно
+        self.locks = {id(follower): asyncio.Lock() for follower in followers}
+        self.flush_lock = None
+        self.stopping = None
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.flush_lock = asyncio.Lock()
+        self.stopping = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stopping.set)
+
+        tasks = [asyncio.create_task(self.poll_loop(follower)) for follower in self.followers]
+        tasks.append(asyncio.create_task(self.flush_loop()))
+        try:
+            await self.stopping.wait()
+            print("INFO: Завершение слежения", file=sys.stderr)
+            await asyncio.gather(*tasks)
+            # Строки, дописанные после последней проверки
+            for follower in self.followers:
+                await self.poll(follower)
+            await self.flush()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def buffered_lines(self) -> int:
+        """Суммарное число строк, найденных с последней записи, по всем лог-файлам"""
+        return sum(rule.total_lines for follower in self.followers for rule in follower.rules)
+
+    async def sleep(self, delay: float) -> None:
+        """Пауза, прерываемая сигналом завершения"""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def poll(self, follower: LogFollower) -> bool:
+        loop = asyncio.get_running_loop()
+        async with self.locks[id(follower)]:
+            try:
+                return await loop.run_in_executor(self.executor, follower.poll)
+            except OSError as e:
+                print(f"WARNING: {follower.path}: {e}", file=sys.stderr)
+                return False
+
+    async def poll_loop(self, follower: LogFollower) -> None:
+        delay = FOLLOW_MIN_DELAY
+        while not self.stopping.is_set():
+            got_data = await self.poll(follower)
+            if got_data and self.buffered_lines() >= self.max_buffered_lines:
+                await self.flush()
+            if follower.pending:
+                continue
+            delay = FOLLOW_MIN_DELAY if got_data else min(delay * 2, self.poll_interval)
+            await self.sleep(delay)
+
+    async def flush_loop(self) -> None:
+        while not self.stopping.is_set():
+            await self.sleep(self.flush_interval)
+            if not self.stopping.is_set():
+                await self.flush()
+
+    async def flush(self) -> None:
+        """Запись отчетов и одно обновление lasttime для всех лог-файлов"""
+        loop = asyncio.get_running_loop()
+        async with self.flush_lock:
+            entries = {}
+            for follower in self.followers:
+                async with self.locks[id(follower)]:
+                    entries.update(await loop.run_in_executor(self.executor, follower.flush))
+            if entries:
+                await loop.run_in_executor(self.executor, update_lasttime_entries, entries)
 
 DEFAULT_CACHE_PATH="/tmp/log_checker/"
 DEFAULT_LASTTIME_NAME="lasttime.csv"
@@ -55,11 +1135,63 @@ DEFAULT_FORMAT_LOGTIME="%Y-%m-%d %H:%M:%S.%3f"
 DEFAULT_PATTERN="err T"
 DEFAULT_LIMIT_LINES=20
 DEFAULT_CSV_DELIMITER=","
+DEFAULT_STATE_BACKEND="csv"
+DEFAULT_FLUSH_INTERVAL=10.0
+DEFAULT_POLL_INTERVAL=1.0
+# Минимальная пауза между проверками лог-файлов в режиме --follow
+FOLLOW_MIN_DELAY=0.05
+DEFAULT_FOLLOW_THREADS=4
+DEFAULT_MAX_BUFFERED_LINES=10000
+# Максимальный объем лог-файла, читаемый за один опрос в режиме --follow
+FOLLOW_READ_LIMIT=16 * 1024 * 1024
+DEFAULT_LASTTIME_DB_NAME="lasttime.sqlite"
+# Хранилище lasttime (--state-backend) -> (класс, имя файла в каталоге кеша)
+STATE_BACKENDS={
+    "csv": (CsvStateStore, DEFAULT_LASTTIME_NAME),
+    "sqlite": (SqliteStateStore, DEFAULT_LASTTIME_DB_NAME),
+}
+# Диапазон (в байтах), после которого двоичный поиск сменяется построчным
+BISECT_MIN_RANGE=64 * 1024
+# Сколько байт с начала строки читать для разбора временной метки
+BISECT_TIME_PREFIX=256
+# Минимальный размер части лог-файла при параллельном чтении
+PARALLEL_CHUNK_MIN=8 * 1024 * 1024
+# Размер блока при последовательном чтении лог-файла
+SCAN_BLOCK_SIZE=1024 * 1024
+# Узлы повторения в дереве разбора регулярного выражения
+SRE_REPEAT_OPS={sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)}
+DEFAULT_PARALLEL_THRESHOLD_MB=64
+DEFAULT_INDEX_STEP_MB=4
+STATS_FORMATS=("json", "prom")
+# Количество функций и мест выделения памяти в сводке --profile/--trace-memory
+PROFILE_TOP=15
+# Суффиксы ротированных архивов: <имя>.1, <имя>.2.gz, <имя>-20260101.xz
+ARCHIVE_SUFFIX_RE=re.compile(r"[.-]\d+(\.gz|\.bz2|\.xz)?")
+# Расширение сжатого архива -> функция открытия с потоковой распаковкой
+ARCHIVE_OPENERS={".gz": gzip.open, ".bz2": bz2.open}
+if lzma is not None:
+    ARCHIVE_OPENERS[".xz"] = lzma.open
+TIME_INDEX_NAME="index"
+# Значение --lc-path-to-logfile для чтения из стандартного ввода
+STDIN_PATH="-"
+REPORT_FORMATS=("text", "json")
+DEFAULT_REPORT_BACKUPS=5
+DEFAULT_TOP_K=100
+DEFAULT_MAX_RECORD_SIZE=64 * 1024
+# Отметка отброшенного продолжения записи, превысившей --max-record-size
+RECORD_TRUNCATED="[...]\n"
+# Маскирование изменяемых частей строки в сигнатуре (--aggregate), в этом порядке
+SIGNATURE_UUID_RE=re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b")
+SIGNATURE_HEX_RE=re.compile(r"\b0[xX][0-9a-fA-F]+\b|\b[0-9a-fA-F]{8,}\b")
+SIGNATURE_NUMBER_RE=re.compile(r"\d+")
 
 FORMAT_LOGTIME=""
 PATTERN=""
 LASTTIME_PATH=Path(".")
 LASTTIME_PREFIX=""
+STATE_STORE=None
+REPORT_FORMAT="text"
+REPORT_SINK=ReportSink()
 LOCAL_CACHE_PATH=Path(".")
 PATH_TO_LOGFILE=Path(".")
 CACHE_PATH=Path(".")
@@ -70,10 +1202,111 @@ LAST_LOG_TIME=CustomDateTime.min
 PATH_TO_BODY=Path(".")
 LIMIT_LINES=20
 CSV_DELIMITER = ","
+FULL_SCAN=False
+STREAM=False
+REVERSE=False
+SKIPPED_COUNT="estimate"
+BISECT=True
+LAST_CSV_TIME=CustomDateTime.min
+SCAN_WORKERS=1
+PARALLEL_SCAN_THRESHOLD=DEFAULT_PARALLEL_THRESHOLD_MB * 1024 * 1024
+LAST_POSITION=LogPosition()
+NEW_POSITION=LogPosition()
+# Основной режим прочитал лог-файл с сохраненной позиции (отсечение по времени не нужно)
+RESUMED=False
+TIME_INDEX=False
+TOP_K=0
+# Режим многострочных записей (--multiline): максимальный размер записи; 0 - построчный режим
+MAX_RECORD_SIZE=0
+STATS=RunStats()
+STATS_OUTPUTS=()
+STATS_DIR=Path(".")
+INDEX_STEP=DEFAULT_INDEX_STEP_MB * 1024 * 1024
 
 def main():
     args = parse_arguments()
+    with profiling(args.profile, args.slow_threshold, args.trace_memory):
+        success = False
+        try:
+            run(args)
+            success = True
+        except SystemExit as e:
+            success = not e.code
+            raise
+        except LogCheckerError as e:
+            print(f"ERROR: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if STATS.enabled:
+                write_stats(success)
+
+@contextmanager
+def profiling(profile: bool, slow_threshold: float, trace_memory: bool):
+    """
+    Профилирование запуска.
+    :param profile: Всегда сохранять профиль cProfile в каталог кеша лог-файла
+    :param slow_threshold: Если запуск дольше этого числа секунд, профиль сохраняется,
+                           а самые затратные функции выводятся в stderr (0 - отключено)
+    :param trace_memory: Вывести в stderr места наибольшего выделения памяти (tracemalloc)
+    Процессы пула (--scan-workers, --workers) не профилируются.
+    """
+    profiler = cProfile.Profile() if profile or slow_threshold > 0 else None
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        elapsed = time.perf_counter() - started
+        slow = slow_threshold > 0 and elapsed > slow_threshold
+        if profiler and (profile or slow):
+            write_profile(profiler, elapsed, slow_threshold if slow else None)
+        if trace_memory:
+            write_memory_trace()
 
+def write_profile(profiler: cProfile.Profile, elapsed: float, slow_threshold: Optional[float]) -> None:
+    """
+    Сохранение профиля в <каталог кеша лог-файла>/profile-<время>-<pid>.prof
+    (в --batch/--follow - в каталог кеша) и сводка для медленного запуска
+    """
+    if LOCAL_CACHE_PATH != Path("."):
+        profile_dir = LOCAL_CACHE_PATH
+    elif CACHE_PATH != Path("."):
+        profile_dir = CACHE_PATH
+    else:
+        # Запуск завершился до init_global
+        profile_dir = Path(DEFAULT_CACHE_PATH)
+    profile_path = Path(profile_dir) / f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof"
+    try:
+        Path(profile_dir).mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(profile_path)
+    except OSError as e:
+        print(f"WARNING: Не удалось сохранить профиль {profile_path}: {e}", file=sys.stderr)
+    else:
+        print(f"INFO: Профиль запуска: {profile_path}", file=sys.stderr)
+
+    if slow_threshold is not None:
+        print(f"WARNING: Запуск занял {elapsed:.3f} с (порог {slow_threshold:g} с), "
+              f"самые затратные функции:", file=sys.stderr)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_TOP)
+
+def write_memory_trace() -> None:
+    """Вывод в stderr пикового объема памяти и мест выделения памяти, занятой к концу запуска"""
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"INFO: Память Python: текущая {current / 1024:.1f} KiB, пиковая {peak / 1024:.1f} KiB", file=sys.stderr)
+    for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+        print(f"INFO:   {stat}", file=sys.stderr)
+
+def run(args: argparse.Namespace) -> None:
+    """Выполнение режима, выбранного параметрами командной строки"""
+    if args.multiline and args.follow:
+        print("WARNING: --multiline не поддерживается в режиме --follow и будет проигнорирован", file=sys.stderr)
     init_global(args.lc_path_to_logfile, 
                 args.additional_name, 
                 args.csv_delimiter, 
@@ -81,28 +1314,145 @@ def main():
                 args.pattern, 
                 args.path_to_body, 
                 args.full_path_to_body, 
-                args.limit_lines
+                args.limit_lines,
+                args.full_scan,
+                args.stream,
+                not args.no_bisect,
+                args.scan_workers,
+                args.parallel_threshold,
+                args.state_backend,
+                args.index,
+                args.index_step,
+                args.reverse,
+                args.skipped_count,
+                args.stats,
+                args.stats_dir,
+                args.aggregate,
+                args.max_record_size if args.multiline and not args.follow else 0,
+                args.report_format,
+                args.report_max_size,
+                args.report_max_reports,
+                args.report_backups
                 )
-    init_lasttime()
-    last_time_unix=get_lasttime()
+    if STATS.enabled and (args.follow or args.batch):
+        print("WARNING: --stats не поддерживается в режимах --follow и --batch и будет проигнорирован", file=sys.stderr)
+        STATS.enabled = False
+    if args.lc_path_to_logfile == STDIN_PATH:
+        if args.batch or args.since or args.until:
+            raise LogCheckerError("Стандартный ввод не поддерживается с --batch, --since и --until")
+        rules = load_rules(args.config) if args.config else [cli_rule(ADDITIONAL_NAME, PATTERN, LIMIT_LINES, PATH_TO_BODY)]
+        stdin_main(rules, args.flush_interval if args.follow else 0)
+        return
+    if args.follow:
+        rules = load_rules(args.config) if args.config else [cli_rule(ADDITIONAL_NAME, PATTERN, LIMIT_LINES, PATH_TO_BODY)]
+        logfiles = ([args.lc_path_to_logfile] if args.lc_path_to_logfile else []) + (args.batch or [])
+        follow_main(logfiles, rules, args.flush_interval, args.poll_interval,
+                    args.follow_threads, args.max_buffered_lines)
+        return
+    if args.batch:
+        rules = load_rules(args.config) if args.config else [cli_rule(ADDITIONAL_NAME, PATTERN, LIMIT_LINES, PATH_TO_BODY)]
+        batch_main(args.batch, rules, args.workers)
+        return
+    if args.since or args.until:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+        with STATS.stage("scan"):
+            range_main(since, until)
+        return
+    if TIME_INDEX:
+        with STATS.stage("index"):
+            update_time_index()
+    if args.config:
+        rules_main(load_rules(args.config))
+        return
+    global LAST_POSITION, LAST_CSV_TIME
+    last_time_unix, LAST_POSITION = parse_lasttime_fields(get_lasttime_fields())
+    LAST_CSV_TIME = last_time_unix
     print(f"{last_time_unix.custom_strftime(DEFAULT_FORMAT_CSVTIME)}", file=sys.stderr)
     print(f"{last_time_unix.custom_strftime(DEFAULT_FORMAT_LOGTIME)}", file=sys.stderr)
-    grep_to_buffer()
-    check_buffer_and_exit()
+    global LAST_LOG_TIME
+    LAST_LOG_TIME = last_time_unix
+    if STREAM:
+        stream_main()
+        return
+    if REVERSE:
+        reverse_main(last_time_unix)
+        return
+    with STATS.stage("scan"):
+        grep_to_buffer()
+    if buffer_is_empty():
+        print(f"Файл LOCAL_BUFFER_FILE: {LOCAL_BUFFER_FILE} пустой", file=sys.stderr)
+        # Сохраняем позицию, чтобы не перечитывать лог в следующий раз
+        update_lasttime()
+        sys.exit(0)
     last_logline = get_last_line(LOCAL_BUFFER_FILE)
     last_time_log = parse_log_time(last_logline)
-    global LAST_LOG_TIME
     LAST_LOG_TIME = last_time_log
     print(f"{last_time_log.custom_strftime(DEFAULT_FORMAT_LOGTIME)}", file=sys.stderr)
     print(f"{last_time_unix.custom_strftime(DEFAULT_FORMAT_LOGTIME)}", file=sys.stderr)
-    if last_time_log <= last_time_unix:
+    # При чтении с сохраненной позиции в буфере только новые строки,
+    # в том числе с той же меткой, что и последняя обработанная
+    if not RESUMED:
+        if last_time_log <= last_time_unix:
+            print("INFO: Нет новый логов", file=sys.stderr)
+            # Время не меняем, но сохраняем новую позицию в файле
+            LAST_LOG_TIME = last_time_unix
+            update_lasttime()
+            sys.exit(0)
+        with STATS.stage("cutoff"):
+            test = del_old_log_in_buffer_file(last_time_unix)
+        print(f"{test}", file=sys.stderr)
+
+    # Обработка результата
+    with STATS.stage("report"):
+        process_files()
+    update_lasttime()
+
+
+def stream_main() -> None:
+    """
+    Обработка в потоковом режиме (--stream): один проход по лог-файлу,
+    в памяти хранится не больше LIMIT_LINES строк, буферный файл не используется.
+    Выполняется через LogChecker.
+    """
+    checker = LogChecker(PATH_TO_LOGFILE, PATTERN, LIMIT_LINES, FORMAT_LOGTIME, ADDITIONAL_NAME,
+                         STATE_STORE, FULL_SCAN, BISECT, SCAN_WORKERS, TOP_K, MAX_RECORD_SIZE,
+                         csv_delimiter=CSV_DELIMITER, encoding=ENCODING,
+                         parallel_threshold=PARALLEL_SCAN_THRESHOLD, verbose=True)
+    with STATS.stage("scan"):
+        result = checker.check(commit=False)
+    if not result.lines:
         print("INFO: Нет новый логов", file=sys.stderr)
+        # Сохраняем позицию, чтобы не перечитывать лог в следующий раз
+        checker.commit(result)
         sys.exit(0)
-    test = del_old_log_in_buffer_file()
-    print(f"{test}", file=sys.stderr)
 
-    # Обработка результата
-    process_files()
+    print(f"{result.last_time.custom_strftime(DEFAULT_FORMAT_LOGTIME)}", file=sys.stderr)
+    with STATS.stage("report"):
+        write_report(result.lines, result.total_lines, signatures=result.signatures)
+    checker.commit(result)
+
+
+def reverse_main(last_time_unix: CustomDateTime) -> None:
+    """
+    Обработка в обратном режиме (--reverse): лог-файл читается от конца,
+    пока не найдено LIMIT_LINES строк или не достигнута сохраненная позиция
+    """
+    with STATS.stage("scan"):
+        lines, total_lines, estimated = reverse_process(last_time_unix)
+    if not lines:
+        print("INFO: Нет новый логов", file=sys.stderr)
+        # Сохраняем позицию, чтобы не перечитывать лог в следующий раз
+        update_lasttime()
+        sys.exit(0)
+
+    global LAST_LOG_TIME
+    # Последняя найденная строка может быть без временной метки (строка-продолжение)
+    LAST_LOG_TIME = try_parse_log_time(lines[-1]) or last_time_unix
+    print(f"{LAST_LOG_TIME.custom_strftime(DEFAULT_FORMAT_LOGTIME)}", file=sys.stderr)
+
+    with STATS.stage("report"):
+        write_report(lines, total_lines, estimated=estimated)
     update_lasttime()
 
 
@@ -113,17 +1463,80 @@ def init_global(path_to_logfile: str,
                 pattern: str, 
                 path_to_body: str, 
                 full_path_to_body: bool, 
-                limit_lines: int
+                limit_lines: int,
+                full_scan: bool = False,
+                stream: bool = False,
+                bisect: bool = True,
+                scan_workers: int = 1,
+                parallel_threshold: int = DEFAULT_PARALLEL_THRESHOLD_MB,
+                state_backend: str = DEFAULT_STATE_BACKEND,
+                time_index: bool = False,
+                index_step: int = DEFAULT_INDEX_STEP_MB,
+                reverse: bool = False,
+                skipped_count: str = "estimate",
+                stats: str = "",
+                stats_dir: str = "",
+                top_k: int = 0,
+                max_record_size: int = 0,
+                report_format: str = "text",
+                report_max_size: float = 0,
+                report_max_reports: int = 0,
+                report_backups: int = DEFAULT_REPORT_BACKUPS
                 ) -> None:
     """
     Инициализация глобальных переменных
     :param path_to_logfile: Путь к лог файлу
     :param additional_name: Суфикс для локального каталога
     :param csv_delimiter: Разделитель CSV-файла
+    :param full_scan: Игнорировать сохраненную позицию и читать лог с начала
+    :param stream: Потоковый режим без буферного файла
+    :param bisect: Искать начало новых записей двоичным поиском по времени
+    :param scan_workers: Количество процессов для параллельного чтения лог-файла
+    :param parallel_threshold: Объем новых данных (МБ), начиная с которого чтение параллельное
+    :param state_backend: Хранилище lasttime: csv или sqlite
+    :param time_index: Поддерживать индекс временных меток лог-файла
+    :param index_step: Шаг индекса временных меток (МБ)
+    :param reverse: Чтение лог-файла от конца до LIMIT_LINES строк или сохраненной позиции
+    :param skipped_count: Подсчет пропущенных строк в режиме reverse: exact или estimate
+    :param stats: Форматы статистики запуска через запятую (json, prom); пусто - без статистики
+    :param stats_dir: Каталог файлов статистики (по умолчанию <CACHE_PATH>/stats)
+    :param top_k: Агрегация строк по сигнатурам с хранением до 2 * top_k сигнатур (0 - отключена)
+    :param max_record_size: Режим многострочных записей с ограничением размера записи (0 - построчный режим)
+    :param report_format: Формат отчета: text или json (JSON Lines, объект на отчет)
+    :param report_max_size: Размер выходного файла для ротации, МБ (0 - без ограничения)
+    :param report_max_reports: Количество отчетов в выходном файле для ротации (0 - без ограничения)
+    :param report_backups: Количество хранимых ротированных выходных файлов
     """
     global LIMIT_LINES
     LIMIT_LINES = limit_lines
 
+    global FULL_SCAN
+    FULL_SCAN = full_scan
+
+    global STREAM
+    STREAM = stream
+
+    global REVERSE
+    REVERSE = reverse
+
+    global SKIPPED_COUNT
+    SKIPPED_COUNT = skipped_count
+
+    global BISECT
+    BISECT = bisect
+
+    global SCAN_WORKERS
+    SCAN_WORKERS = scan_workers
+
+    global PARALLEL_SCAN_THRESHOLD
+    PARALLEL_SCAN_THRESHOLD = parallel_threshold * 1024 * 1024
+
+    global TIME_INDEX
+    TIME_INDEX = time_index
+
+    global INDEX_STEP
+    INDEX_STEP = max(1, index_step) * 1024 * 1024
+
     global FORMAT_LOGTIME
     FORMAT_LOGTIME = format_logtime
 
@@ -131,7 +1544,11 @@ def init_global(path_to_logfile: str,
     PATTERN = pattern
 
     global PATH_TO_LOGFILE
-    PATH_TO_LOGFILE = Path(path_to_logfile).resolve()
+    # В режиме --batch лог-файл может быть не задан
+    PATH_TO_LOGFILE = Path(path_to_logfile).resolve() if path_to_logfile else Path(".")
+    if path_to_logfile == STDIN_PATH:
+        # Стандартный ввод: запись lasttime различается по --additional-name
+        PATH_TO_LOGFILE = Path(STDIN_PATH)
     
     global ADDITIONAL_NAME
     ADDITIONAL_NAME = additional_name
@@ -147,22 +1564,48 @@ def init_global(path_to_logfile: str,
     Path(CACHE_PATH).mkdir(parents=True, exist_ok=True)
 
     global PATH_TO_BODY
-    if full_path_to_body:
-        PATH_TO_BODY = Path(path_to_body).resolve()
-    else:
-        PATH_TO_BODY = CACHE_PATH / Path(path_to_body)
+    PATH_TO_BODY = resolve_path_to_body(path_to_body, full_path_to_body)
+
+    global LASTTIME_PATH, STATE_STORE
+    store_class, lasttime_name = STATE_BACKENDS[state_backend]
+    LASTTIME_PATH = CACHE_PATH / Path(lasttime_name)
+    STATE_STORE = store_class(LASTTIME_PATH, CSV_DELIMITER, ENCODING)
+
+    global REPORT_FORMAT, REPORT_SINK
+    REPORT_FORMAT = report_format
+    REPORT_SINK = ReportSink(int(report_max_size * 1024 * 1024), report_max_reports, report_backups)
+
+    global TOP_K
+    TOP_K = top_k
+    if TOP_K and REVERSE:
+        # Обратный режим собирает только последние строки
+        print("WARNING: --reverse не поддерживается с --aggregate, используется --stream", file=sys.stderr)
+        REVERSE = False
+        STREAM = True
 
-    global LASTTIME_PATH
-    LASTTIME_PATH = CACHE_PATH / Path(DEFAULT_LASTTIME_NAME)
-    Path(LASTTIME_PATH).touch(exist_ok=True)
+    global MAX_RECORD_SIZE
+    MAX_RECORD_SIZE = max_record_size
+    if MAX_RECORD_SIZE and not STREAM:
+        # Буферный файл и обратное чтение обрабатывают отдельные строки
+        print("INFO: Многострочные записи обрабатываются в режиме --stream", file=sys.stderr)
+        REVERSE = False
+        STREAM = True
 
-    global LOCAL_CACHE_PATH
-    LOCAL_CACHE_PATH = CACHE_PATH / Path(PurePosixPath(PATH_TO_LOGFILE).name + f"{ADDITIONAL_NAME}")
-    Path(LOCAL_CACHE_PATH).mkdir(parents=True, exist_ok=True)
+    global STATS_OUTPUTS, STATS_DIR
+    STATS_OUTPUTS = tuple(name for name in stats.split(",") if name)
+    STATS_DIR = Path(stats_dir) if stats_dir else CACHE_PATH / "stats"
+    STATS.enabled = bool(STATS_OUTPUTS)
+    if STATS.enabled:
+        STATE_STORE = TimedStateStore(STATE_STORE)
 
-    global LOCAL_BUFFER_FILE
-    LOCAL_BUFFER_FILE = Path(LOCAL_CACHE_PATH) / Path("buffer")
-    Path(LOCAL_BUFFER_FILE).touch(exist_ok=True)
+    if path_to_logfile:
+        global LOCAL_CACHE_PATH
+        LOCAL_CACHE_PATH = CACHE_PATH / Path(PurePosixPath(PATH_TO_LOGFILE).name + f"{ADDITIONAL_NAME}")
+        Path(LOCAL_CACHE_PATH).mkdir(parents=True, exist_ok=True)
+
+        global LOCAL_BUFFER_FILE
+        LOCAL_BUFFER_FILE = Path(LOCAL_CACHE_PATH) / Path("buffer")
+        Path(LOCAL_BUFFER_FILE).touch(exist_ok=True)
 
     print(f"DEFAULT_CACHE_PATH: {DEFAULT_CACHE_PATH}", file=sys.stderr)
     print(f"DEFAULT_LASTTIME_NAME: {DEFAULT_LASTTIME_NAME}", file=sys.stderr)
@@ -179,74 +1622,705 @@ def init_global(path_to_logfile: str,
     print(f"ADDITIONAL_NAME: {ADDITIONAL_NAME}", file=sys.stderr)
     print(f"LOCAL_BUFFER_FILE: {LOCAL_BUFFER_FILE}", file=sys.stderr)
     print(f"PATH_TO_BODY: {PATH_TO_BODY}", file=sys.stderr)
+    print(f"FULL_SCAN: {FULL_SCAN}", file=sys.stderr)
+    print(f"STREAM: {STREAM}", file=sys.stderr)
+    print(f"REVERSE: {REVERSE}", file=sys.stderr)
+    print(f"BISECT: {BISECT}", file=sys.stderr)
+    print(f"SCAN_WORKERS: {SCAN_WORKERS}", file=sys.stderr)
+    print(f"PARALLEL_SCAN_THRESHOLD: {PARALLEL_SCAN_THRESHOLD}", file=sys.stderr)
+    print(f"TIME_INDEX: {TIME_INDEX}", file=sys.stderr)
+    print(f"INDEX_STEP: {INDEX_STEP}", file=sys.stderr)
     
 
-def init_lasttime() -> None:
+def range_main(since: Optional[CustomDateTime], until: Optional[CustomDateTime]) -> None:
     """
-    Инициализация файла lasttime.csv
+    Выборка строк по PATTERN с временными метками из интервала [since, until]
+    (--since/--until). Читается только диапазон лог-файла, найденный по индексу
+    временных меток; lasttime не изменяется.
+    Строки без временной метки относятся к времени предыдущей строки с меткой
+    (любой, а не только подходящей под шаблон), поэтому префильтр не применяется.
     """
-    # Проверить наличие записи для текущего лог-файла
-    entry_exists = False
-    with open(LASTTIME_PATH, 'r+', encoding=ENCODING) as f:
-        expected_prefix = f"{LASTTIME_PREFIX}"
-        
-        # Поиск существующей записи
-        for line in f:
-            if line.startswith(expected_prefix):
-                entry_exists = True
+    regex = re.compile(PATTERN)
+    lines = deque(maxlen=LIMIT_LINES or None)
+    total_lines = 0
+    with open(PATH_TO_LOGFILE, "rb") as src:
+        stat = os.fstat(src.fileno())
+        index = update_time_index(src, stat)
+        end = find_data_end(src, stat.st_size)
+        start, stop = index.lookup(since, until, end)
+        print(f"INFO: Чтение диапазона {start}-{stop} из {end}", file=sys.stderr)
+
+        log_time = None
+        for _, line in iter_records(iter_log_lines(src, start, stop, ENCODING), cli_scan_settings()):
+            log_time = try_parse_log_time(line) or log_time
+            if until is not None and log_time is not None and log_time > until:
                 break
-        
-        # Добавить запись, если не найдена
-        if not entry_exists:
-            f.write(f"{expected_prefix}0.000001\n")
+            if log_time is None or (since is not None and log_time < since) or not regex.search(line):
+                continue
+            total_lines += 1
+            lines.append(line)
+
+    if not lines:
+        print("INFO: Нет записей за указанный интервал", file=sys.stderr)
+        sys.exit(0)
+    write_report(lines, total_lines)
+
+def update_time_index(src=None, stat: Optional[os.stat_result] = None) -> TimeIndex:
+    """
+    Загружает и дополняет индекс временных меток PATH_TO_LOGFILE
+    :param src: Открытый в бинарном режиме лог-файл (по умолчанию открывается)
+    :param stat: Результат os.fstat для src
+    """
+    index = TimeIndex(LOCAL_CACHE_PATH / TIME_INDEX_NAME, INDEX_STEP)
+    index.load()
+    if src is None:
+        with open(PATH_TO_LOGFILE, "rb") as log_file:
+            index.update(log_file, os.fstat(log_file.fileno()))
+    else:
+        index.update(src, stat)
+    return index
+
+def write_stats(success: bool) -> None:
+    """
+    Запись статистики запуска в STATS_DIR: <имя лог-файла><суфикс>.json
+    и/или .prom (формат textfile collector для node_exporter).
+    Файлы записываются через временный файл и атомарно переименовываются.
+    """
+    stats = {
+        "logfile": str(PATH_TO_LOGFILE),
+        "additional_name": ADDITIONAL_NAME,
+        "pattern": PATTERN,
+        "success": success,
+        "started": STATS.started,
+        "duration_seconds": time.time() - STATS.started,
+        "stages": {name: {"wall_seconds": wall, "cpu_seconds": cpu} for name, (wall, cpu) in STATS.stages.items()},
+        **STATS.counters,
+        "peak_rss_bytes": STATS.peak_rss(),
+    }
+    contents = {}
+    if "json" in STATS_OUTPUTS:
+        contents["json"] = json.dumps(stats, indent=2, ensure_ascii=False) + "\n"
+    if "prom" in STATS_OUTPUTS:
+        contents["prom"] = format_prometheus_stats(stats)
+
+    name = PurePosixPath(PATH_TO_LOGFILE).name + ADDITIONAL_NAME
+    try:
+        STATS_DIR.mkdir(parents=True, exist_ok=True)
+        for suffix, content in contents.items():
+            with tempfile.NamedTemporaryFile("w", encoding=ENCODING, dir=STATS_DIR,
+                                             prefix=f".{name}.", delete=False) as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_file.name, STATS_DIR / f"{name}.{suffix}")
+    except OSError as e:
+        print(f"WARNING: Не удалось записать статистику в {STATS_DIR}: {e}", file=sys.stderr)
+
+def format_prometheus_stats(stats: dict) -> str:
+    """Статистика запуска в текстовом формате Prometheus"""
+    def escape(value: str) -> str:
+        return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+    labels = f'logfile="{escape(stats["logfile"])}",additional_name="{escape(stats["additional_name"])}"'
+    metrics = [
+        ("logchecker_last_run_timestamp_seconds", "Время начала последнего запуска", [("", stats["started"])]),
+        ("logchecker_last_run_success", "1, если последний запуск завершился без ошибки", [("", int(stats["success"]))]),
+        ("logchecker_run_duration_seconds", "Длительность запуска", [("", stats["duration_seconds"])]),
+        ("logchecker_stage_wall_seconds", "Время этапа по часам",
+         [(f',stage="{name}"', stage["wall_seconds"]) for name, stage in stats["stages"].items()]),
+        ("logchecker_stage_cpu_seconds", "Процессорное время этапа, включая процессы пула",
+         [(f',stage="{name}"', stage["cpu_seconds"]) for name, stage in stats["stages"].items()]),
+        ("logchecker_bytes_read", "Прочитано байт лог-файла", [("", stats["bytes_read"])]),
+        ("logchecker_lines_scanned", "Просмотрено строк лог-файла", [("", stats["lines_scanned"])]),
+        ("logchecker_lines_matched", "Найдено новых строк по шаблону", [("", stats["lines_matched"])]),
+        ("logchecker_lines_skipped", "Найденные строки, не вошедшие в отчет", [("", stats["lines_skipped"])]),
+        ("logchecker_peak_rss_bytes", "Пиковый размер резидентной памяти", [("", stats["peak_rss_bytes"])]),
+    ]
+    output = []
+    for metric, help_text, samples in metrics:
+        output.append(f"# HELP {metric} {help_text}")
+        output.append(f"# TYPE {metric} gauge")
+        for extra_labels, value in samples:
+            output.append(f"{metric}{{{labels}{extra_labels}}} {value}")
+    return "\n".join(output) + "\n"
+
+def resolve_path_to_body(path_to_body: str, full_path_to_body: bool) -> Path:
+    """Путь к выходному файлу: полный или относительно каталога с кешем"""
+    if full_path_to_body:
+        return Path(path_to_body).resolve()
+    return CACHE_PATH / Path(path_to_body)
+
+def load_rules(config_path: str) -> list:
+    """
+    Загрузка правил из конфигурационного файла (TOML, JSON или INI).
+    Незаданные в правиле параметры берутся из командной строки.
+
+    TOML: массив таблиц [[rules]]
+    JSON: {"rules": [{...}, ...]} или просто список правил
+    INI:  каждая секция - правило, имя секции - additional_name по умолчанию
+
+    Параметры правила: additional_name, pattern, limit_lines,
+    path_to_body, full_path_to_body
+    """
+    suffix = Path(config_path).suffix.lower()
+    try:
+        if suffix == ".toml":
+            if tomllib is None:
+                raise LogCheckerError("Для TOML-конфигурации нужен Python 3.11+")
+            with open(config_path, "rb") as f:
+                items = tomllib.load(f).get("rules", [])
+        elif suffix == ".json":
+            with open(config_path, "r", encoding=ENCODING) as f:
+                data = json.load(f)
+            items = data.get("rules", []) if isinstance(data, dict) else data
+        elif suffix in (".ini", ".cfg", ".conf"):
+            parser = configparser.ConfigParser(interpolation=None)
+            parser.read(config_path, encoding=ENCODING)
+            items = []
+            for name in parser.sections():
+                section = parser[name]
+                item = dict(section)
+                item.setdefault("additional_name", name)
+                if "limit_lines" in section:
+                    item["limit_lines"] = section.getint("limit_lines")
+                if "full_path_to_body" in section:
+                    item["full_path_to_body"] = section.getboolean("full_path_to_body")
+                items.append(item)
+        else:
+            raise LogCheckerError(f"Неизвестный формат конфигурации '{config_path}' (ожидается .toml, .json или .ini)")
+
+        rules = []
+        for item in items:
+            rules.append(cli_rule(
+                additional_name=str(item.get("additional_name", "")),
+                pattern=item.get("pattern", PATTERN),
+                limit_lines=int(item.get("limit_lines", LIMIT_LINES)),
+                path_to_body=resolve_path_to_body(item.get("path_to_body", PATH_TO_BODY),
+                                                  bool(item.get("full_path_to_body", False)))
+            ))
+    except (ValueError, TypeError, AttributeError, re.error, configparser.Error) as e:
+        raise LogCheckerError(f"Некорректная конфигурация '{config_path}': {e}") from e
+
+    if not rules:
+        raise LogCheckerError(f"В конфигурации '{config_path}' нет правил")
+
+    names = [rule.additional_name for rule in rules]
+    if len(set(names)) != len(names):
+        raise LogCheckerError(f"Значения additional_name в '{config_path}' должны быть уникальны: {names}")
+
+    return rules
+
+def rules_main(rules: list) -> None:
+    """
+    Обработка нескольких правил за одно чтение лог-файла.
+    Для каждого правила отдельно выполняется отсечение по времени,
+    сбор последних строк, запись отчета и обновление lasttime.
+    """
+    entries = read_lasttime_entries([rule.lasttime_prefix for rule in rules])
+    for rule in rules:
+        rule.last_time, rule.position = parse_lasttime_fields(entries[rule.lasttime_prefix])
+
+    with STATS.stage("scan"):
+        position = scan_rules(rules, cli_scan_settings())
+    with STATS.stage("report"):
+        entries = finish_rules(rules, position)
+    update_lasttime_entries(entries)
+
+def scan_rules(rules: list, settings: ScanSettings, prefilter: Optional[re.Pattern] = None) -> LogPosition:
+    """
+    Одно чтение лог-файла правил с проверкой всех правил для каждой строки.
+    Все правила должны относиться к одному лог-файлу.
+    :param settings: Параметры чтения лог-файла
+    :param prefilter: Готовый префильтр правил (по умолчанию строится по шаблонам)
+    :return: Достигнутая позиция в лог-файле
+    """
+    path_to_logfile = rules[0].path_to_logfile
+    try:
+        with open(path_to_logfile, "rb") as src:
+            stat = os.fstat(src.fileno())
+            prefilter = prefilter or build_prefilter([rule.pattern for rule in rules], settings.encoding)
+            if settings.max_record_size:
+                # Шаблон проверяется по всей записи, а не по отдельным строкам
+                prefilter = None
+            # Строки, дописанные до ротации, находятся в архивах и идут раньше строк лог-файла
+            archives = find_rotated_archives(rules, stat, settings)
+            if archives:
+                scan_archives(rules, archives, prefilter, settings)
+
+            for rule in rules:
+                rule.start_offset, rule.resumed = get_start_offset(src, stat, rule.position, rule.last_time,
+                                                                   settings)
+                rule.cutoff_passed = rule.cutoff_passed or rule.resumed
+
+            # Читаем с минимальной позиции до конца последней полной строки;
+            # каждое правило учитывает строки от своей позиции
+            start = min(rule.start_offset for rule in rules)
+            if settings.max_record_size and start > 0:
+                start = find_record_start(src, start, settings)
+            end = max(start, find_data_end(src, stat.st_size))
+            # Части файла в процессах пула возвращают только последние строки,
+            # поэтому при агрегации по сигнатурам файл читается в одном процессе;
+            # многострочная запись может оказаться на границе частей
+            sequential = settings.max_record_size or any(rule.signatures is not None for rule in rules)
+            if settings.scan_workers > 1 and end - start >= settings.parallel_threshold and not sequential:
+                parallel_scan(rules, src, start, end, prefilter, settings)
+            else:
+                lines = iter_log_lines(src, start, end, settings.encoding, prefilter)
+                for line_start, line in iter_records(lines, settings):
+                    for rule in rules:
+                        if line_start >= rule.start_offset and rule.regex.search(line):
+                            rule.add_line(line)
+    except IOError as e:
+        raise RuntimeError(f"Ошибка ввода-вывода: {e}") from e
+
+    return LogPosition(stat.st_dev, stat.st_ino, stat.st_size, end)
+
+def parallel_scan(rules: list, src, start: int, end: int, prefilter: Optional[re.Pattern],
+                  settings: ScanSettings) -> None:
+    """
+    Параллельное чтение большого диапазона лог-файла [start, end): диапазон делится
+    на части по границам строк, части обрабатываются в пуле процессов,
+    результаты объединяются в порядке следования в файле.
+    """
+    with mmap.mmap(src.fileno(), end, access=mmap.ACCESS_READ) as mm:
+        chunk_size = max(PARALLEL_CHUNK_MIN, -(-(end - start) // (settings.scan_workers * 4)))
+        bounds = [start]
+        while bounds[-1] < end:
+            bound = bounds[-1] + chunk_size
+            bounds.append(end if bound >= end else mm.find(b"\n", bound - 1) + 1 or end)
+
+    if settings.verbose:
+        print(f"INFO: Параллельное чтение {end - start} байт, частей: {len(bounds) - 1}", file=sys.stderr)
+    specs = [(rule.pattern, rule.last_time, rule.limit_lines, rule.start_offset, rule.cutoff_passed)
+             for rule in rules]
+    prefilter_pattern = prefilter.pattern if prefilter else None
+    with ProcessPoolExecutor(max_workers=settings.scan_workers,
+                             initializer=init_worker,
+                             initargs=(STATS.enabled,)) as pool:
+        chunks = pool.map(run_counted, repeat(scan_chunk),
+                          repeat(str(rules[0].path_to_logfile)), bounds[:-1], bounds[1:],
+                          repeat(specs), repeat(settings), repeat(prefilter_pattern))
+        for counters, chunk in chunks:
+            STATS.merge(counters)
+            for rule, result in zip(rules, chunk):
+                rule.merge_chunk(*result)
+
+def run_counted(func, *args) -> tuple:
+    """Задача пула процессов с передачей счетчиков RunStats: (счетчики, результат)"""
+    STATS.take()
+    result = func(*args)
+    return STATS.take(), result
+
+def scan_chunk(path_to_logfile: str, start: int, end: int, specs: list, settings: ScanSettings,
+               prefilter_pattern: Optional[bytes] = None) -> list:
+    """
+    Задача пула процессов: обработка части лог-файла [start, end) по всем правилам.
+    Для каждого правила возвращает (пройдено ли отсечение по времени,
+    количество строк после отсечения, количество всех строк, последние строки).
+    """
+    prefilter = re.compile(prefilter_pattern) if prefilter_pattern else None
+    with open(path_to_logfile, "rb") as src, \
+         mmap.mmap(src.fileno(), end, access=mmap.ACCESS_READ) as mm:
+        if STATS.enabled:
+            for pos in range(start, end, SCAN_BLOCK_SIZE):
+                STATS.count_data(mm[pos:min(end, pos + SCAN_BLOCK_SIZE)])
+        return collect_lines(((line_start, decode_line(mm[line_start:line_end], settings.encoding))
+                              for line_start, line_end in iter_line_spans(mm, start, end, prefilter)),
+                             specs, settings.parser)
+
+def collect_lines(lines: Iterator[tuple], specs: list, parser: LogTimeParser) -> list:
+    """
+    Проверка строк (смещение, строка) по правилам specs для scan_chunk и scan_archive.
+    Результат для каждого правила - как у scan_chunk.
+    """
+    rules = []
+    for pattern, last_time, limit_lines, start_offset, cutoff_passed in specs:
+        rules.append((re.compile(pattern), last_time, start_offset,
+                      [cutoff_passed, 0, 0, deque(maxlen=limit_lines or None)]))
+
+    for line_start, line in lines:
+        for regex, last_time, start_offset, result in rules:
+            if line_start >= start_offset and regex.search(line):
+                result[2] += 1
+                result[3].append(line)
+                if not result[0]:
+                    log_time = parser.try_parse_line(line)
+                    result[0] = log_time is not None and log_time > last_time
+                if result[0]:
+                    result[1] += 1
+
+    return [(passed, total_cut, total, list(lines))
+            for _, _, _, (passed, total_cut, total, lines) in rules]
+
+def find_rotated_archives(rules: list, stat: os.stat_result, settings: ScanSettings) -> list:
+    """
+    Поиск ротированных архивов лог-файла правил (<имя>.1, <имя>.2.gz, <имя>-20260101.xz),
+    в которые могли попасть строки после сохраненной позиции.
+    Архивы ищутся, только если после сохранения позиции лог-файл был ротирован или усечен.
+    Несжатый архив с сохраненными st_dev/st_ino читается с сохраненной позиции,
+    остальные архивы, измененные после последней обработанной метки, - с начала.
+
+    Returns:
+        Список (путь, смещения начала чтения по правилам) в порядке первой
+        временной метки архива (или st_mtime, если метку найти не удалось)
+    """
+    rotated = [rule for rule in rules
+               if rule.position.offset > 0
+               and ((rule.position.dev, rule.position.ino) != (stat.st_dev, stat.st_ino)
+                    or stat.st_size < rule.position.offset)]
+    if not rotated:
+        return []
+
+    path = Path(rules[0].path_to_logfile)
+    checkpoint = min(rule.last_time for rule in rotated).timestamp()
+    archives = []
+    for candidate in path.parent.glob(glob.escape(path.name) + "[.-]*"):
+        suffix = ARCHIVE_SUFFIX_RE.fullmatch(candidate.name[len(path.name):])
+        if suffix is None or (suffix.group(1) and suffix.group(1) not in ARCHIVE_OPENERS):
+            continue
+        try:
+            archive_stat = candidate.stat()
+        except OSError:
+            continue
+
+        starts = []
+        for rule in rules:
+            if rule not in rotated:
+                # Правило уже прочитало все строки до ротации
+                starts.append(sys.maxsize)
+            elif (not suffix.group(1)
+                  and (rule.position.dev, rule.position.ino) == (archive_stat.st_dev, archive_stat.st_ino)
+                  and rule.position.offset <= archive_stat.st_size):
+                starts.append(rule.position.offset)
+            else:
+                starts.append(0)
+        if archive_stat.st_mtime > checkpoint or any(0 < start < sys.maxsize for start in starts):
+            # Порядок имен зависит от схемы ротации (.1 новее .2, но -20260102 новее -20260101),
+            # поэтому архивы упорядочиваются по времени первой строки
+            first_time = (read_first_log_time(str(candidate), settings)
+                          or CustomDateTime.fromtimestamp(archive_stat.st_mtime))
+            archives.append((first_time, str(candidate), starts))
+
+    archives.sort(key=lambda archive: archive[:2])
+    return [(archive, starts) for _, archive, starts in archives]
+
+def read_first_log_time(path: str, settings: ScanSettings) -> Optional[CustomDateTime]:
+    """Временная метка первой строки архива (None, если в начале архива меток нет)"""
+    opener = ARCHIVE_OPENERS.get(Path(path).suffix, open)
+    try:
+        with opener(path, "rb") as src:
+            head = src.read(BISECT_MIN_RANGE)
+    except (OSError, EOFError, ValueError) as e:
+        print(f"WARNING: {path}: {e}", file=sys.stderr)
+        return None
+    for raw_line in head.splitlines()[:-1]:
+        log_time = settings.parser.try_parse_line(
+            raw_line[:BISECT_TIME_PREFIX].decode(settings.encoding, errors="replace"))
+        if log_time is not None:
+            return log_time
+    return None
+
+def scan_archives(rules: list, archives: list, prefilter: Optional[re.Pattern], settings: ScanSettings) -> None:
+    """
+    Чтение ротированных архивов перед лог-файлом. Несколько архивов
+    распаковываются параллельно (до settings.scan_workers процессов), результаты
+    объединяются в порядке ротации, чтобы строки шли по времени.
+    """
+    paths = [archive for archive, _ in archives]
+    if settings.verbose:
+        print(f"INFO: Лог-файл ротирован, чтение архивов: {', '.join(paths)}", file=sys.stderr)
+    specs = [[(rule.pattern, rule.last_time, rule.limit_lines, start, rule.cutoff_passed)
+              for rule, start in zip(rules, starts)]
+             for _, starts in archives]
+    prefilter_pattern = prefilter.pattern if prefilter else None
+
+    if settings.max_record_size or any(rule.signatures is not None for rule in rules):
+        # Для агрегации по сигнатурам нужны все строки, а для записей - их сборка: архивы читаются здесь же
+        for path, starts in archives:
+            lines = iter_archive_lines(path, min(starts), settings.encoding, prefilter)
+            for line_start, line in iter_records(lines, settings):
+                for rule, start in zip(rules, starts):
+                    if line_start >= start and rule.regex.search(line):
+                        rule.add_line(line)
+        return
+    if settings.scan_workers > 1 and len(archives) > 1:
+        with ProcessPoolExecutor(max_workers=min(settings.scan_workers, len(archives)),
+                                 initializer=init_worker,
+                                 initargs=(STATS.enabled,)) as pool:
+            results = []
+            for counters, result in pool.map(run_counted, repeat(scan_archive), paths, specs,
+                                              repeat(settings), repeat(prefilter_pattern)):
+                STATS.merge(counters)
+                results.append(result)
+    else:
+        results = map(scan_archive, paths, specs, repeat(settings), repeat(prefilter_pattern))
+    for chunk in results:
+        for rule, result in zip(rules, chunk):
+            rule.merge_chunk(*result)
+
+def scan_archive(path: str, specs: list, settings: ScanSettings, prefilter_pattern: Optional[bytes] = None) -> list:
+    """Задача пула процессов: обработка ротированного архива по всем правилам (как scan_chunk)"""
+    prefilter = re.compile(prefilter_pattern) if prefilter_pattern else None
+    start = min(spec[3] for spec in specs)
+    return collect_lines(iter_archive_lines(path, start, settings.encoding, prefilter), specs, settings.parser)
+
+def iter_archive_lines(path: str, start: int, encoding: str,
+                       prefilter: Optional[re.Pattern] = None) -> Iterator[tuple]:
+    """
+    Генератор строк ротированного архива начиная со смещения start
+    (для сжатых архивов - смещение в распакованных данных).
+    Сжатые архивы распаковываются потоково блоками по SCAN_BLOCK_SIZE.
+    Возвращает пары (смещение начала строки, строка)
+    """
+    opener = ARCHIVE_OPENERS.get(Path(path).suffix, open)
+    with opener(path, "rb") as src:
+        if start >= sys.maxsize:
+            return
+        src.seek(start)
+        # Ротированный архив больше не дописывается: последняя строка может быть без '\n'
+        yield from iter_block_lines(iter_blocks(src.read), start, encoding, prefilter, unterminated=True)
+
+def finish_rules(rules: list, position: LogPosition) -> dict:
+    """
+    Запись отчетов по правилам после scan_rules
+    :return: Новые записи lasttime (префикс -> значения) для update_lasttime_entries
+    """
+    new_entries = {}
+    for rule in rules:
+        if not rule.lines:
+            print(f"INFO: Нет новый логов для '{rule.path_to_logfile}{rule.additional_name}'", file=sys.stderr)
+        new_entries[rule.lasttime_prefix] = rule.flush_report(position)
+    return new_entries
+
+def follow_main(logfiles: list, rules: list, flush_interval: float, poll_interval: float,
+                threads: int, max_buffered_lines: int) -> None:
+    """
+    Режим слежения (--follow): лог-файлы остаются открытыми, дописанные строки
+    проверяются правилами, отчеты и lasttime записываются раз в flush_interval секунд.
+    Все лог-файлы обслуживаются одним циклом событий asyncio (FollowEngine).
+    Завершается по SIGINT/SIGTERM с записью накопленных отчетов.
+    """
+    settings = cli_scan_settings()
+    followers = [LogFollower([rule.for_logfile(path) for rule in rules], settings)
+                 for path in expand_logfiles(logfiles)]
+    if not followers:
+        raise LogCheckerError(f"Не найдено ни одного лог-файла: {logfiles}")
+
+    entries = read_lasttime_entries([rule.lasttime_prefix for follower in followers for rule in follower.rules])
+    for follower in followers:
+        for rule in follower.rules:
+            rule.last_time, rule.position = parse_lasttime_fields(entries[rule.lasttime_prefix])
+        follower.open(resume=True)
+    print(f"INFO: Слежение за лог-файлами: {len(followers)}", file=sys.stderr)
+
+    engine = FollowEngine(followers, flush_interval, poll_interval, threads, max_buffered_lines)
+    try:
+        asyncio.run(engine.run())
+    finally:
+        for follower in followers:
+            follower.close()
+
+def stdin_main(rules: list, flush_interval: float) -> None:
+    """
+    Проверка потока из стандартного ввода (--lc-path-to-logfile -), например
+    journalctl -f или kubectl logs -f, без промежуточного файла.
+    Уже обработанные строки отсекаются по временной метке из lasttime
+    (запись "-<additional_name>"), позиция в потоке не сохраняется.
+    :param flush_interval: Записывать отчеты и lasttime раз в flush_interval секунд
+                           (--follow); 0 - один отчет после конца ввода
+    Завершается по концу ввода или SIGINT/SIGTERM с записью накопленных отчетов.
+    """
+    entries = read_lasttime_entries([rule.lasttime_prefix for rule in rules])
+    for rule in rules:
+        rule.last_time, _ = parse_lasttime_fields(entries[rule.lasttime_prefix])
+    settings = cli_scan_settings()
+    prefilter = None if settings.max_record_size else build_prefilter([rule.pattern for rule in rules],
+                                                                      settings.encoding)
+    print("INFO: Чтение стандартного ввода", file=sys.stderr)
+
+    def flush() -> None:
+        update_lasttime_entries({rule.lasttime_prefix: rule.flush_report(LogPosition()) for rule in rules})
+
+    # SIGTERM завершает чтение так же, как SIGINT
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        lines = iter_stdin_lines(sys.stdin.buffer.fileno(), settings.encoding, prefilter, flush_interval)
+        for item in iter_records(lines, settings):
+            if item is None:
+                # Пауза во вводе дольше flush_interval
+                flush()
+                continue
+            for rule in rules:
+                if rule.regex.search(item[1]):
+                    rule.add_line(item[1])
+    except KeyboardInterrupt:
+        print("INFO: Чтение стандартного ввода прервано", file=sys.stderr)
+    finally:
+        flush()
+
+def iter_stdin_lines(fd: int, encoding: str, prefilter: Optional[re.Pattern] = None,
+                     flush_interval: float = 0) -> Iterator[Optional[tuple]]:
+    """
+    Генератор строк потока fd, читаемого блоками до SCAN_BLOCK_SIZE по мере поступления данных.
+    При flush_interval > 0 раз в flush_interval секунд дополнительно возвращает None
+    (момент записи отчетов), даже если данных нет.
+    Возвращает пары (смещение начала строки в потоке, строка)
+    """
+    # Последняя строка потока может быть без '\n'
+    yield from iter_block_lines(iter_fd_blocks(fd, flush_interval), 0, encoding, prefilter, unterminated=True)
+
+def iter_fd_blocks(fd: int, flush_interval: float = 0) -> Iterator[Optional[bytes]]:
+    """
+    Блоки данных потока fd (до SCAN_BLOCK_SIZE байт) по мере поступления.
+    При flush_interval > 0 раз в flush_interval секунд дополнительно возвращает None.
+    """
+    next_flush = time.monotonic() + flush_interval
+    while True:
+        if flush_interval:
+            timeout = max(0.0, next_flush - time.monotonic())
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if not ready:
+                yield None
+                next_flush = time.monotonic() + flush_interval
+                continue
+        data = os.read(fd, SCAN_BLOCK_SIZE)
+        if not data:
+            return
+        yield data
+        if flush_interval and time.monotonic() >= next_flush:
+            yield None
+            next_flush = time.monotonic() + flush_interval
+
+def batch_main(logfiles: list, rules: list, workers: int) -> None:
+    """
+    Пакетная обработка множества лог-файлов (--batch) в пуле процессов.
+    Чтение и фильтрация выполняются параллельно, а запись отчетов
+    и обновление lasttime.csv - последовательно в основном процессе.
+
+    Args:
+        logfiles: Пути и glob-шаблоны лог-файлов
+        rules: Правила (из --config или параметров командной строки)
+        workers: Количество процессов
+    """
+    paths = expand_logfiles(logfiles)
+    if not paths:
+        raise LogCheckerError(f"Не найдено ни одного лог-файла: {logfiles}")
+    print(f"INFO: Лог-файлов в пакете: {len(paths)}", file=sys.stderr)
+
+    jobs = [[rule.for_logfile(path) for rule in rules] for path in paths]
+    entries = read_lasttime_entries([rule.lasttime_prefix for job in jobs for rule in job])
+    for job in jobs:
+        for rule in job:
+            rule.last_time, rule.position = parse_lasttime_fields(entries[rule.lasttime_prefix])
+
+    new_entries = {}
+    failed = False
+    settings = cli_scan_settings()
+    if workers <= 1 or len(jobs) == 1:
+        results = [run_batch_job(scan_job, job, settings) for job in jobs]
+    else:
+        # Процессы пула не создают вложенных пулов
+        worker_settings = settings._replace(scan_workers=1)
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=init_worker,
+                                 initargs=(False,)) as pool:
+            futures = [pool.submit(scan_job, job, worker_settings) for job in jobs]
+            results = [run_batch_job(future.result) for future in futures]
+
+    # Отчеты пишутся в порядке лог-файлов, lasttime.csv перезаписывается один раз
+    for job, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            print(f"ERROR: {job[0].path_to_logfile}: {result}", file=sys.stderr)
+            failed = True
+            continue
+        job_rules, position = result
+        # Ошибка записи отчета одного лог-файла не отменяет обновление lasttime остальных
+        try:
+            new_entries.update(finish_rules(job_rules, position))
+        except (LogCheckerError, OSError) as e:
+            print(f"ERROR: {job[0].path_to_logfile}: {e}", file=sys.stderr)
+            failed = True
+
+    update_lasttime_entries(new_entries)
+    if failed:
+        raise LogCheckerError("Не все лог-файлы пакета обработаны")
+
+def run_batch_job(func, *args):
+    """Выполняет задачу пакета; исключение возвращается как результат"""
+    try:
+        return func(*args)
+    except Exception as e:
+        return e
+
+def scan_job(rules: list, settings: ScanSettings) -> tuple:
+    """Задача пула процессов: чтение одного лог-файла по всем правилам"""
+    position = scan_rules(rules, settings)
+    return rules, position
+
+def init_worker(stats: bool = False) -> None:
+    """
+    Инициализация процесса пула: включение счетчиков RunStats.
+    Параметры чтения передаются в задачи (ScanSettings).
+    """
+    STATS.enabled = stats
+
+def cli_scan_settings() -> ScanSettings:
+    """Параметры чтения лог-файла из параметров командной строки"""
+    return ScanSettings(FORMAT_LOGTIME, ENCODING, FULL_SCAN, BISECT, SCAN_WORKERS, PARALLEL_SCAN_THRESHOLD,
+                        MAX_RECORD_SIZE)
+
+def cli_rule(additional_name: str, pattern: str, limit_lines: int, path_to_body: Path,
+             top_k: Optional[int] = None) -> Rule:
+    """Правило для лог-файла PATH_TO_LOGFILE с параметрами командной строки"""
+    return Rule(additional_name, pattern, limit_lines, path_to_body, PATH_TO_LOGFILE, CSV_DELIMITER,
+                FORMAT_LOGTIME, TOP_K if top_k is None else top_k)
+
+def expand_logfiles(logfiles: list) -> list:
+    """Раскрывает glob-шаблоны; возвращает уникальные полные пути к файлам"""
+    paths = []
+    for item in logfiles:
+        matches = glob.glob(item) if glob.has_magic(item) else [item]
+        for match in sorted(matches):
+            path = Path(match).resolve()
+            if path.is_file() and path not in paths:
+                paths.append(path)
+            elif not path.is_file():
+                print(f"WARNING: Файл '{match}' не существует, пропущен", file=sys.stderr)
+    return paths
 
 def parse_time_string(time_str) -> CustomDateTime:
     seconds_float = float(time_str)
     return CustomDateTime.fromtimestamp(seconds_float)
 
+def format_lasttime_entry(last_time: CustomDateTime, position: LogPosition) -> list:
+    """
+    Формирует значения записи lasttime.csv:
+    <путь><суфикс>,<время>,<st_dev>,<st_ino>,<размер>,<смещение>
+    """
+    return [last_time.custom_strftime(DEFAULT_FORMAT_CSVTIME), *(str(value) for value in position)]
+
 def update_lasttime() -> None:
     """
     Обновление значения времени в файле lasttime.csv
     """
-    time_value = LAST_LOG_TIME.custom_strftime(DEFAULT_FORMAT_CSVTIME)
-    lines = []
-    updated = False
-
-    # Чтение существующего содержимого и обновление строки
-    with LASTTIME_PATH.open(mode="r+", encoding=ENCODING) as file:
-        for line in file:
-            if line.strip().startswith(LASTTIME_PREFIX):
-                lines.append(f"{LASTTIME_PREFIX}{time_value}\n")
-                updated = True
-            else:
-                lines.append(line)
+    update_lasttime_entries({LASTTIME_PREFIX: format_lasttime_entry(LAST_LOG_TIME, NEW_POSITION)})
 
-        # Если строка не была обновлена — добавляем новую строку
-        if not updated:
-            lines.append(f"{LASTTIME_PREFIX}{time_value}\n")
-
-    # Запись обратно в файл
-    with LASTTIME_PATH.open(mode="w", encoding=ENCODING) as file:
-        file.writelines(lines)
+def update_lasttime_entries(entries: dict) -> None:
+    """
+    Обновление нескольких записей lasttime за одну запись в хранилище
+    :param entries: Словарь префикс записи -> значения
+    """
+    STATE_STORE.write(entries)
     
 def process_files() -> None:
     current = LOCAL_BUFFER_FILE
-    path_to_output = PATH_TO_BODY
     log_file_name = PATH_TO_LOGFILE
     limit_lines = LIMIT_LINES
-    try:
-        # Проверяем наличие исходных файлов
-        if not current.exists():
-            print(f"Ошибка: Файл '{current}' не найден.")
-            exit(1)
-        
-        if not log_file_name.exists():
-            print(f"Ошибка: Файл '{log_file_name}' не найден.")
-            exit(1)
-
-        # Создаем директорию для выходного файла, если её ещё нет
-        path_to_output.parent.mkdir(parents=True, exist_ok=True)
+    # Проверяем наличие исходных файлов
+    if not current.exists():
+        raise LogCheckerError(f"Файл '{current}' не найден")
+    if not log_file_name.exists():
+        raise LogCheckerError(f"Файл '{log_file_name}' не найден")
 
+    try:
         # Чтение нужного количества строк с конца файла
         with open(current, 'r', encoding=ENCODING) as input_file:
             # Подсчет общего количества строк
@@ -254,57 +2328,128 @@ def process_files() -> None:
             input_file.seek(0)  # Возвращаемся в начало файла
             # Чтение последних limit_lines строк
             lines = deque(input_file, maxlen=limit_lines or None)
+            signatures = None
+            if TOP_K:
+                signatures = SignatureCounter(TOP_K, get_time_parser(FORMAT_LOGTIME).segments)
+                input_file.seek(0)
+                for line in input_file:
+                    signatures.add(line)
+    except (OSError, ValueError) as e:
+        raise LogCheckerError(f"Ошибка чтения {current}: {e}") from e
+
+    write_report(lines, total_lines, signatures=signatures)
+
+def write_report(lines, total_lines: int, rule: Optional[Rule] = None, estimated: bool = False,
+                 signatures: Optional[SignatureCounter] = None) -> None:
+    """
+    Дописывает отчет в PATH_TO_BODY
+    :param lines: Последние LIMIT_LINES строк
+    :param total_lines: Общее количество найденных строк
+    :param rule: Правило из --config; по умолчанию используются параметры командной строки
+    :param estimated: total_lines - оценка (количество пропущенных строк выводится с '~')
+    :param signatures: Сигнатуры строк (--aggregate); если заданы, вместо строк в отчет
+                       выводятся LIMIT_LINES самых частых сигнатур (по умолчанию - сигнатуры правила)
+    """
+    path_to_output = rule.path_to_body if rule else PATH_TO_BODY
+    log_file_name = rule.path_to_logfile if rule else PATH_TO_LOGFILE
+    limit_lines = rule.limit_lines if rule else LIMIT_LINES
+    additional_name = rule.additional_name if rule else ADDITIONAL_NAME
+    pattern = rule.pattern if rule else PATTERN
+    if signatures is None and rule is not None:
+        signatures = rule.signatures
+    try:
+        # Создаем директорию для выходного файла, если её ещё нет
+        path_to_output.parent.mkdir(parents=True, exist_ok=True)
 
         # Вычисляем количество пропущенных строк
-        if limit_lines is not None and limit_lines > 0:
+        if signatures is not None:
+            # Строки, не вошедшие в выведенные сигнатуры
+            top = signatures.top(limit_lines or 0)
+            if REPORT_FORMAT == "text":
+                lines = [format_signature(*entry) for entry in top]
+            skipped_lines = max(0, total_lines - sum(entry[1] for entry in top))
+            estimated = estimated or signatures.floor > 0
+        elif limit_lines is not None and limit_lines > 0:
             skipped_lines = max(0, total_lines - limit_lines)
         else:
             skipped_lines = 0
+        STATS.counters["lines_matched"] += total_lines
+        STATS.counters["lines_skipped"] += skipped_lines
             
-        # Запись результата в выходной файл
-        with open(path_to_output, 'a', encoding=ENCODING) as output_file:
-            # Заголовочная секция
-            output_file.write(f"---\n")
-            output_file.write(f"File name: {log_file_name}\n")
-            output_file.write(f"Skipped lines: {skipped_lines}\n")
-            output_file.write(f"ADDITIONAL_NAME: {ADDITIONAL_NAME}\n")
-            output_file.write(f"PATTERN: {PATTERN}\n")
-
-            output_file.write(f"\n")
-        
-            # Кладём строки в файл
-            for line in lines:
-                output_file.write(line)
-                
-            # Завершающая секция
-            output_file.write("---\n\n")
+        # Отчет собирается целиком и записывается в выходной файл одной записью
+        if REPORT_FORMAT == "json":
+            report = {
+                "time": datetime.now().astimezone().isoformat(timespec="seconds"),
+                "file": str(log_file_name),
+                "additional_name": additional_name,
+                "pattern": pattern,
+                "total_lines": total_lines,
+                "skipped_lines": skipped_lines,
+                "skipped_estimated": estimated,
+            }
+            if signatures is not None:
+                report["signatures"] = [
+                    {"signature": signature, "count": count, "error": error,
+                     "first_seen": first_seen, "last_seen": last_seen, "sample": sample}
+                    for signature, count, error, first_seen, last_seen, sample in top]
+            else:
+                report["lines"] = [line.rstrip("\n") for line in lines]
+            data = json.dumps(report, ensure_ascii=False) + "\n"
+        else:
+            data = "".join([
+                # Заголовочная секция
+                f"---\n",
+                f"File name: {log_file_name}\n",
+                f"Skipped lines: {'~' if estimated else ''}{skipped_lines}\n",
+                f"ADDITIONAL_NAME: {additional_name}\n",
+                f"PATTERN: {pattern}\n",
+                f"\n",
+                # Кладём строки в файл
+                *lines,
+                # Завершающая секция
+                "---\n\n",
+            ])
+        REPORT_SINK.append(path_to_output, data)
     
         print("Файлы успешно обработаны!")
     
     except Exception as e:
-        print(f"Произошла ошибка: {e}")
-        exit(1)
+        raise LogCheckerError(f"Произошла ошибка записи отчета {path_to_output}: {e}") from e
+
+def format_signature(signature: str, count: int, error: int, first_seen: str, last_seen: str, sample: str) -> str:
+    """Строка отчета для сигнатуры: счетчик (с '~', если он оценка), первое и последнее появление, пример"""
+    return (f"[{'~' if error else ''}{count}] {first_seen} .. {last_seen} {signature}\n"
+            f"    {sample}\n")
 
-def get_lasttime() -> CustomDateTime:
+def parse_lasttime_fields(fields: list) -> tuple:
     """
-    Получение последней сохраненной метки времени из CSV-файла
-    :return: Значение временной метки
+    Разбор значений записи lasttime.csv
+    :return: (временная метка, позиция в лог-файле)
     """
-    time_str='0.0'
+    time_str = fields[0] if fields else '0.0'
+    return parse_time_string(time_str), parse_lastposition(fields)
+
+def parse_lastposition(fields: list) -> LogPosition:
     try:
-        with open(LASTTIME_PATH, 'r', encoding=ENCODING) as f:
-            search_prefix = f"{LASTTIME_PREFIX}"
-            
-            for line in f:
-                if line.startswith(search_prefix):
-                    # Разделить строку и взять второе значение
-                    time_str = line.strip().split(CSV_DELIMITER)[1]
-                    
-    except FileNotFoundError:
-        pass
-    return parse_time_string(time_str)
+        return LogPosition(*(int(value) for value in fields[1:5]))
+    except ValueError:
+        print(f"WARNING: Некорректная позиция в {LASTTIME_PATH}: {fields}", file=sys.stderr)
+        return LogPosition()
+
+def get_lasttime_fields() -> list:
+    """
+    Возвращает значения записи lasttime.csv для текущего лог-файла (без префикса)
+    """
+    return read_lasttime_entries([LASTTIME_PREFIX])[LASTTIME_PREFIX]
+
+def read_lasttime_entries(prefixes: list) -> dict:
+    """
+    Читает записи lasttime для нескольких префиксов за одно обращение к хранилищу
+    :return: Словарь префикс -> значения записи (пустой список, если записи нет)
+    """
+    return STATE_STORE.read(prefixes)
 
-def del_old_log_in_buffer_file() -> int:
+def del_old_log_in_buffer_file(last_csv_time: CustomDateTime) -> int:
     """
     Определяет стартовую позицию для обработки новых записей в лог-файле.
     
@@ -319,7 +2464,7 @@ def del_old_log_in_buffer_file() -> int:
         ValueError: Если время не может быть конвертировано
     """
     # Конвертация CSV-времени в формат лога
-    str_last_log_time = LAST_LOG_TIME.custom_strftime(DEFAULT_FORMAT_LOGTIME)
+    str_last_log_time = last_csv_time.custom_strftime(DEFAULT_FORMAT_LOGTIME)
     print(f"str_last_log_time: {str_last_log_time}", file=sys.stderr)
     found = False
     start_line = 1
@@ -334,11 +2479,16 @@ def del_old_log_in_buffer_file() -> int:
                         start_line = line_num + 1
                         continue
                     
-                    if found or not found:
+                    # Оставляем только строки после метки
+                    if found:
                         tmp_file.write(line)
             
+        if found:
             # Заменяем исходный файл временным
-            tmp_path.replace(LOCAL_BUFFER_FILE)
+            shutil.move(tmp_path, LOCAL_BUFFER_FILE)
+        else:
+            # Метка не найдена: буфер уже содержит только новые записи
+            tmp_path.unlink()
             
     except Exception as e:
         if 'tmp_path' in locals() and tmp_path.exists():
@@ -356,31 +2506,506 @@ def grep_to_buffer() -> None:
         if not Path(PATH_TO_LOGFILE).is_file():
             raise FileNotFoundError(f"Файл '{PATH_TO_LOGFILE}' не найден")
 
-        # Компиляция регулярного выражения
-        regex = re.compile(pattern=PATTERN)
+        # Компиляция регулярного выражения; отсечение по времени
+        # выполняет del_old_log_in_buffer_file, поэтому в буфер попадают все строки
+        rule = cli_rule(ADDITIONAL_NAME, PATTERN, 0, PATH_TO_BODY, top_k=0)
+        rule.last_time, rule.position = LAST_CSV_TIME, LAST_POSITION
+        rule.cutoff_passed = True
 
-        # Чтение и фильтрация строк
-        with open(PATH_TO_LOGFILE, "r", encoding=ENCODING) as src:
-            matched_lines = [line for line in src if regex.search(line)]
+        global NEW_POSITION, RESUMED
+        NEW_POSITION = scan_rules([rule], cli_scan_settings())
+        RESUMED = rule.resumed
 
         # Запись результатов
         with open(LOCAL_BUFFER_FILE, "w", encoding=ENCODING) as dst:
             #print(f"{matched_lines}", file=sys.stderr)
-            dst.writelines(matched_lines)
+            dst.writelines(rule.lines)
+
+    except re.error as e:
+        raise ValueError(f"Ошибка в регулярном выражении: {e}") from e
+    except IOError as e:
+        raise RuntimeError(f"Ошибка ввода-вывода: {e}") from e
+
+def iter_records(lines: Iterator[tuple], settings: ScanSettings) -> Iterator[tuple]:
+    """
+    Сборка многострочных записей (--multiline) из пар (смещение, строка).
+    Запись начинается строкой с временной меткой settings.format_logtime, следующие
+    строки без метки (например, стек вызовов) добавляются к ней, пока размер записи
+    не превышает settings.max_record_size символов; остальные отбрасываются с отметкой
+    RECORD_TRUNCATED. Строки без метки до первой записи пропускаются.
+    В построчном режиме (max_record_size == 0) возвращает lines без изменений.
+    Возвращает пары (смещение последней строки записи, запись): запись, начатую
+    до позиции чтения правила, нужно проверить, только если после этой позиции
+    к ней дописаны строки-продолжения (см. find_record_start)
+    """
+    max_record_size = settings.max_record_size
+    if not max_record_size:
+        yield from lines
+        return
+    parse_line = settings.parser.parse_line
+    last_start = 0
+    parts = []
+    size = 0
+    for line_start, line in lines:
+        try:
+            parse_line(line)
+        except ValueError:
+            if not parts:
+                continue
+            if size + len(line) <= max_record_size:
+                parts.append(line)
+            elif size <= max_record_size:
+                parts.append(RECORD_TRUNCATED)
+            size += len(line)
+            last_start = line_start
+            continue
+        if parts:
+            yield last_start, "".join(parts)
+        last_start, parts, size = line_start, [line], len(line)
+    if parts:
+        yield last_start, "".join(parts)
+
+def find_record_start(src, offset: int, settings: ScanSettings) -> int:
+    """
+    Начало многострочной записи, к которой могут относиться строки от offset:
+    смещение последней строки с временной меткой перед offset (не дальше
+    4 * settings.max_record_size байт). Запись, прочитанная в прошлый запуск,
+    собирается заново, чтобы строки-продолжения, дописанные после сохранения
+    позиции (например, конец стека вызовов), не были пропущены.
+    """
+    limit = max(0, offset - 4 * settings.max_record_size)
+    for line_start, line in iter_log_lines_reverse(src, limit, offset, settings.encoding):
+        # Первая строка диапазона может начинаться до limit
+        if (line_start > limit or limit == 0) and settings.parser.try_parse_line(line) is not None:
+            return line_start
+    return offset
+
+def iter_log_lines(src, start: int, end: int, encoding: str,
+                   prefilter: Optional[re.Pattern] = None) -> Iterator[tuple]:
+    """
+    Генератор строк лог-файла из диапазона [start, end), где end - конец полной строки.
+    Файл читается блоками по SCAN_BLOCK_SIZE; декодируются только строки,
+    содержащие литералы prefilter (или все строки, если prefilter не задан).
+    Возвращает пары (смещение начала строки, строка)
+    """
+    src.seek(start)
+    yield from iter_block_lines(iter_blocks(src.read, end - start), start, encoding, prefilter)
+
+def iter_blocks(read, size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Блоки данных read(n) по SCAN_BLOCK_SIZE байт до конца данных
+    или до size байт, если size задан
+    """
+    while size is None or size > 0:
+        data = read(SCAN_BLOCK_SIZE if size is None else min(SCAN_BLOCK_SIZE, size))
+        if not data:
+            return
+        if size is not None:
+            size -= len(data)
+        yield data
+
+def iter_block_lines(blocks: Iterator[Optional[bytes]], base: int, encoding: str,
+                     prefilter: Optional[re.Pattern] = None,
+                     unterminated: bool = False) -> Iterator[Optional[tuple]]:
+    """
+    Генератор строк из последовательных блоков данных, первый из которых начинается
+    со смещения base; строка, не закончившаяся в блоке, продолжается в следующем.
+    Декодируются только строки, содержащие литералы prefilter (или все строки,
+    если prefilter не задан). None из blocks передается без изменений.
+    :param unterminated: Вернуть последнюю строку без '\n' в конце данных
+    Возвращает пары (смещение начала строки, строка)
+    """
+    tail = b""
+    for data in blocks:
+        if data is None:
+            yield None
+            continue
+        if STATS.enabled:
+            STATS.count_data(data)
+        block = tail + data
+        cut = block.rfind(b"\n") + 1
+        for line_start, line_end in iter_line_spans(block, 0, cut, prefilter):
+            yield base + line_start, decode_line(block[line_start:line_end], encoding)
+        base += cut
+        tail = block[cut:]
+    if unterminated and tail and (prefilter is None or prefilter.search(tail)):
+        yield base, decode_line(tail + b"\n", encoding)
+
+def iter_line_spans(buf, pos: int, end: int, prefilter: Optional[re.Pattern]) -> Iterator[tuple]:
+    """
+    Границы (начало, конец) строк buf[pos:end], содержащих литералы prefilter
+    (или всех строк, если prefilter не задан). end - конец полной строки.
+    """
+    if prefilter is None:
+        while pos < end:
+            line_end = buf.find(b"\n", pos, end) + 1
+            yield pos, line_end
+            pos = line_end
+        return
+
+    while pos < end:
+        match = prefilter.search(buf, pos, end)
+        if match is None:
+            return
+        line_start = buf.rfind(b"\n", pos, match.start()) + 1 or pos
+        line_end = buf.find(b"\n", match.start(), end) + 1
+        yield line_start, line_end
+        pos = line_end
+
+def find_data_end(src, size: int) -> int:
+    """Смещение конца последней полной строки (после последнего '\\n') лог-файла"""
+    end = size
+    while end > 0:
+        block_start = max(0, end - SCAN_BLOCK_SIZE)
+        src.seek(block_start)
+        newline = src.read(end - block_start).rfind(b"\n")
+        if newline != -1:
+            return block_start + newline + 1
+        end = block_start
+    return 0
+
+def build_prefilter(patterns: list, encoding: str) -> Optional[re.Pattern]:
+    """
+    Байтовое регулярное выражение из литералов (в кодировке лог-файла), без которых
+    не может совпасть ни один из шаблонов. None, если литералы выделить не удалось.
+    """
+    return _build_prefilter(tuple(patterns), encoding)
+
+@lru_cache(maxsize=None)
+def _build_prefilter(patterns: tuple, encoding: str) -> Optional[re.Pattern]:
+    literals = set()
+    for pattern in patterns:
+        pattern_literals = required_literals(pattern, encoding)
+        if not pattern_literals:
+            return None
+        literals.update(pattern_literals)
+    return re.compile(b"|".join(re.escape(literal) for literal in sorted(literals)))
+
+def required_literals(pattern: str, encoding: str) -> Optional[set]:
+    """
+    Анализ регулярного выражения: набор подстрок (bytes), хотя бы одна из которых
+    входит в любое совпадение. Например, для "inf T|err T|wrn T" - все три
+    альтернативы, для "err T.*timeout" - "timeout".
+    None, если такой набор выделить нельзя (например, при флаге IGNORECASE).
+    """
+    try:
+        if re.compile(pattern).flags & re.IGNORECASE:
+            return None
+        literals = _required_literals(list(sre_parse.parse(pattern)))
+    except (re.error, RecursionError):
+        return None
+    if not literals:
+        return None
+    encoded = {literal.encode(encoding) for literal in literals}
+    if any(not literal or b"\n" in literal for literal in encoded):
+        return None
+    return encoded
+
+def _required_literals(items: list) -> Optional[set]:
+    """Лучший обязательный набор литералов для последовательности узлов sre_parse"""
+    best = None
+    run = []
+    for op, av in items + [(None, None)]:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            best = _better_literals(best, {"".join(run)})
+            run = []
+        if op is sre_parse.SUBPATTERN:
+            _, add_flags, del_flags, sub = av
+            if not add_flags and not del_flags:
+                best = _better_literals(best, _required_literals(list(sub)))
+        elif op is sre_parse.BRANCH:
+            alternatives = [_required_literals(list(branch)) for branch in av[1]]
+            if all(alternatives):
+                best = _better_literals(best, set().union(*alternatives))
+        elif op in SRE_REPEAT_OPS:
+            min_repeat, _, sub = av
+            if min_repeat >= 1:
+                best = _better_literals(best, _required_literals(list(sub)))
+        elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+            best = _better_literals(best, _required_literals(list(av)))
+    return best
+
+def _better_literals(current: Optional[set], candidate: Optional[set]) -> Optional[set]:
+    """Выбирает более избирательный набор: длиннее самый короткий литерал, меньше альтернатив"""
+    if not candidate:
+        return current
+    if not current:
+        return candidate
+    def score(literals):
+        return (min(len(literal) for literal in literals), -len(literals))
+    return candidate if score(candidate) > score(current) else current
+
+def stream_process(last_csv_time: CustomDateTime) -> tuple:
+    """
+    Однопроходная обработка лог-файла без буферного файла:
+    фильтрация, отсечение по времени, подсчет пропущенных строк
+    и сбор последних LIMIT_LINES строк.
+
+    Args:
+        last_csv_time: Последняя обработанная временная метка
+
+    Returns:
+        (последние строки, общее количество новых строк)
+    """
+    try:
+        rule = cli_rule(ADDITIONAL_NAME, PATTERN, LIMIT_LINES, PATH_TO_BODY)
+        rule.last_time, rule.position = last_csv_time, LAST_POSITION
+
+        global NEW_POSITION
+        NEW_POSITION = scan_rules([rule], cli_scan_settings())
+        return rule.lines, rule.total_lines
+
+    except re.error as e:
+        raise ValueError(f"Ошибка в регулярном выражении: {e}") from e
+    except IOError as e:
+        raise RuntimeError(f"Ошибка ввода-вывода: {e}") from e
+
+def reverse_process(last_csv_time: CustomDateTime) -> tuple:
+    """
+    Чтение лог-файла блоками от конца к началу до LIMIT_LINES подходящих строк,
+    сохраненной позиции или строки не новее last_csv_time.
+    Если чтение остановлено по LIMIT_LINES, количество строк в непрочитанной части
+    считается отдельным проходом (SKIPPED_COUNT == "exact") или оценивается
+    по плотности найденных строк в прочитанной части ("estimate").
+
+    Returns:
+        (последние строки, общее количество новых строк, количество оценено)
+    """
+    rule = cli_rule(ADDITIONAL_NAME, PATTERN, LIMIT_LINES, PATH_TO_BODY)
+    rule.last_time, rule.position = last_csv_time, LAST_POSITION
+    settings = cli_scan_settings()
+    prefilter = build_prefilter([PATTERN], ENCODING)
+    lines = []
+    global NEW_POSITION
+    try:
+        with open(PATH_TO_LOGFILE, "rb") as src:
+            stat = os.fstat(src.fileno())
+            if find_rotated_archives([rule], stat, settings):
+                # Строки до ротации находятся в архивах, которые читаются только вперед
+                lines, total_lines = stream_process(last_csv_time)
+                return lines, total_lines, False
+
+            start, resumed = get_start_offset(src, stat, LAST_POSITION, last_csv_time, settings)
+            end = max(start, find_data_end(src, stat.st_size))
+            NEW_POSITION = LogPosition(stat.st_dev, stat.st_ino, stat.st_size, end)
+
+            # Начало самой ранней просмотренной строки
+            pos = end
+            # Непрочитанная часть [start, pos) содержит только обработанные строки
+            reached = False
+            for line_start, line in iter_log_lines_reverse(src, start, end, ENCODING, prefilter):
+                if LIMIT_LINES > 0 and len(lines) >= LIMIT_LINES:
+                    break
+                if not rule.regex.search(line):
+                    continue
+                # С сохраненной позиции все строки новые, иначе чтение идет до обработанной метки
+                log_time = None if resumed else try_parse_log_time(line)
+                if log_time is not None and log_time <= last_csv_time:
+                    pos, reached = line_start, True
+                    break
+                lines.append(line)
+                pos = line_start
+            else:
+                pos, reached = start, True
+            lines.reverse()
+
+            total_lines = len(lines)
+            estimated = False
+            if not reached:
+                if SKIPPED_COUNT == "exact":
+                    counter = cli_rule(ADDITIONAL_NAME, PATTERN, 1, PATH_TO_BODY, top_k=0)
+                    counter.last_time, counter.cutoff_passed = last_csv_time, resumed
+                    for _, line in iter_log_lines(src, start, pos, ENCODING, prefilter):
+                        if counter.regex.search(line):
+                            counter.add_line(line)
+                    total_lines += counter.total_lines
+                else:
+                    total_lines += round(len(lines) * (pos - start) / (end - pos))
+                    estimated = True
+            print(f"INFO: Прочитано с конца {end - pos} байт из {end - start}", file=sys.stderr)
+            return lines, total_lines, estimated
 
     except re.error as e:
         raise ValueError(f"Ошибка в регулярном выражении: {e}") from e
     except IOError as e:
         raise RuntimeError(f"Ошибка ввода-вывода: {e}") from e
 
+def iter_log_lines_reverse(src, start: int, end: int, encoding: str,
+                           prefilter: Optional[re.Pattern] = None) -> Iterator[tuple]:
+    """
+    Генератор строк лог-файла из диапазона [start, end) от конца к началу,
+    end - конец полной строки. Файл читается блоками по SCAN_BLOCK_SIZE;
+    декодируются только строки, содержащие литералы prefilter.
+    Возвращает пары (смещение начала строки, строка)
+    """
+    pos = end
+    # Конец строки, начало которой находится в предыдущем блоке
+    head = b""
+    while pos > start:
+        block_start = max(start, pos - SCAN_BLOCK_SIZE)
+        src.seek(block_start)
+        data = src.read(pos - block_start)
+        if STATS.enabled:
+            STATS.count_data(data)
+        block = data + head
+        pos = block_start
+        # Первая строка блока может начинаться в предыдущем блоке
+        if block_start == start:
+            cut = 0
+        else:
+            cut = block.find(b"\n") + 1
+            if cut == 0:
+                # В блоке нет конца строки: строка длиннее SCAN_BLOCK_SIZE
+                head = block
+                continue
+        spans = list(iter_line_spans(block, cut, len(block), prefilter))
+        for line_start, line_end in reversed(spans):
+            yield block_start + line_start, decode_line(block[line_start:line_end], encoding)
+        head = block[:cut]
+
+def get_start_offset(src, stat: os.stat_result, position: LogPosition, last_time: CustomDateTime,
+                     settings: ScanSettings) -> tuple:
+    """
+    Определяет смещение, с которого нужно читать лог-файл.
+    Если сохраненную позицию использовать нельзя (позиция не сохранена,
+    файл был ротирован, усечен или перезаписан), начало новых записей ищется
+    двоичным поиском по временной метке, иначе возвращается 0 (полное чтение).
+
+    Args:
+        src: Открытый в бинарном режиме лог-файл
+        stat: Результат os.fstat для src
+        position: Сохраненная позиция
+        last_time: Последняя обработанная временная метка
+        settings: Параметры чтения (full_scan, bisect, формат и кодировка для поиска по времени)
+
+    Returns:
+        (смещение, чтение с сохраненной позиции). Сохраненная позиция точно отделяет
+        новые строки, поэтому отсечение по времени нужно только в остальных случаях:
+        иначе терялись бы новые строки с той же меткой, что и последняя обработанная
+    """
+    if settings.full_scan:
+        return 0, False
+
+    offset = get_saved_offset(src, stat, position, settings.verbose)
+    if offset is not None:
+        if settings.verbose:
+            print(f"INFO: Продолжение чтения с позиции {offset}", file=sys.stderr)
+        return offset, True
+
+    # Для новой записи в lasttime.csv метка времени равна 0.000001
+    if settings.bisect and last_time.timestamp() >= 1:
+        offset = find_time_offset(src, stat.st_size, last_time, settings)
+        if settings.verbose:
+            print(f"INFO: Начало новых записей по времени: позиция {offset}", file=sys.stderr)
+        return offset, False
+
+    return 0, False
+
+def get_saved_offset(src, stat: os.stat_result, position: LogPosition, verbose: bool = True) -> Optional[int]:
+    """
+    Проверяет сохраненную позицию.
+    Возвращает None, если позиция не сохранена,
+    файл был ротирован (сменился st_dev/st_ino), усечен или перезаписан.
+    :param verbose: Выводить причину отказа от сохраненной позиции (INFO)
+    """
+    if position.offset <= 0:
+        return None
+
+    if (stat.st_dev, stat.st_ino) != (position.dev, position.ino):
+        if verbose:
+            print("INFO: Лог-файл ротирован, полное чтение", file=sys.stderr)
+        return None
+
+    if stat.st_size < position.offset:
+        if verbose:
+            print("INFO: Лог-файл усечен, полное чтение", file=sys.stderr)
+        return None
+
+    # Сохраненная позиция всегда указывает на начало строки
+    src.seek(position.offset - 1)
+    if src.read(1) != b"\n":
+        if verbose:
+            print("INFO: Лог-файл перезаписан, полное чтение", file=sys.stderr)
+        return None
+
+    return position.offset
+
+def find_time_offset(src, size: int, after: CustomDateTime, settings: ScanSettings) -> int:
+    """
+    Двоичный поиск по временным меткам в упорядоченном по времени лог-файле.
+    Возвращает смещение первой строки с меткой новее after
+    (или конец последней полной строки, если таких строк нет).
+    Строки без временной метки (продолжения многострочных записей)
+    при сравнении пропускаются.
+
+    Args:
+        src: Открытый в бинарном режиме лог-файл
+        size: Размер файла
+        after: Последняя обработанная временная метка
+        settings: Параметры чтения (формат временной метки и кодировка)
+    """
+    if size == 0:
+        return 0
+
+    with mmap.mmap(src.fileno(), size, access=mmap.ACCESS_READ) as mm:
+        # Все строки до lo имеют метку не новее after
+        lo, hi = 0, size
+        while hi - lo > BISECT_MIN_RANGE:
+            mid = (lo + hi) // 2
+            pos = mm.find(b"\n", mid - 1) + 1
+            log_time, line_start = read_next_log_time(mm, pos, hi, settings)
+            if log_time is None or log_time > after:
+                hi = mid
+            else:
+                lo = line_start
+
+        # Досматриваем оставшийся диапазон построчно
+        pos = lo
+        while True:
+            end = mm.find(b"\n", pos)
+            if end == -1:
+                return pos
+            log_time = settings.parser.try_parse_line(
+                mm[pos:min(end, pos + BISECT_TIME_PREFIX)].decode(settings.encoding, errors="replace"))
+            if log_time is not None and log_time > after:
+                return pos
+            pos = end + 1
+
+def read_next_log_time(mm: mmap.mmap, pos: int, end: int, settings: ScanSettings) -> tuple:
+    """
+    Ищет первую строку с временной меткой, начинающуюся в [pos, end).
+    Возвращает (метка, смещение строки) или (None, end)
+    """
+    while 0 < pos < end:
+        line_end = mm.find(b"\n", pos, end)
+        if line_end == -1:
+            break
+        log_time = settings.parser.try_parse_line(
+            mm[pos:min(line_end, pos + BISECT_TIME_PREFIX)].decode(settings.encoding, errors="replace"))
+        if log_time is not None:
+            return log_time, pos
+        pos = line_end + 1
+    return None, end
+
+def decode_line(raw_line: bytes, encoding: str) -> str:
+    """
+    Декодирует строку лога, приводя окончание строки к '\n'.
+    Некорректные для encoding байты заменяются на U+FFFD.
+    """
+    line = raw_line.decode(encoding, errors="replace")
+    if line.endswith("\r\n"):
+        line = line[:-2] + "\n"
+    return line
+
 def parse_time(input_time: str) -> CustomDateTime:
     """Парсит строку времени в объект CustomDateTime"""
     try:
         return CustomDateTime.custom_strptime(input_time, FORMAT_LOGTIME)
     except ValueError as e:
-        print(f"ERROR: Неверный формат времени '{input_time}'. Ожидается: {FORMAT_LOGTIME}", file=sys.stderr)
-        print(f"{e}", file=sys.stderr)
-        sys.exit(1)
+        raise LogCheckerError(f"Неверный формат времени '{input_time}'. Ожидается: {FORMAT_LOGTIME}\n{e}") from e
 
 def parse_log_time(log_line: str) -> CustomDateTime:
     """
@@ -392,29 +3017,33 @@ def parse_log_time(log_line: str) -> CustomDateTime:
     Returns:
         Объект CustomDateTime с временной меткой
     
-    В случае ошибки выводит сообщение и завершает программу с кодом 1
+    В случае ошибки вызывает LogCheckerError
     """
     if not log_line:
-        print("ERROR: Пустая строка лога", file=sys.stderr)
-        sys.exit(1)
+        raise LogCheckerError("Пустая строка лога")
 
     try:
-        # Нормализация формата (удаление лишних пробелов)
-        normalized_format = ' '.join(FORMAT_LOGTIME.split())
-        segments = len(normalized_format.split())
-        
-        # Извлечение временной метки из строки лога
-        parts = log_line.split(maxsplit=segments)
-        if len(parts) < segments:
-            raise ValueError(f"Недостаточно сегментов в строке лога. Ожидается {segments}, получено {len(parts)}")
-        
-        time_stamp = ' '.join(parts[:segments])
+        time_stamp = split_log_time(log_line)
         return parse_time(time_stamp)
         
     except Exception as e:
-        print(f"ERROR: Не удалось извлечь время из лога: {str(e)}", file=sys.stderr)
-        print(f"Строка лога: '{log_line[:100]}...'", file=sys.stderr)  # Выводим первые 100 символов для отладки
-        sys.exit(1)
+        # Первые 100 символов строки для отладки
+        raise LogCheckerError(f"Не удалось извлечь время из лога: {str(e)}\n"
+                              f"Строка лога: '{log_line[:100]}...'") from e
+
+def try_parse_log_time(log_line: str) -> Optional[CustomDateTime]:
+    """
+    Как parse_log_time, но без исключения:
+    для строк без временной метки возвращает None
+    """
+    return get_time_parser(FORMAT_LOGTIME).try_parse_line(log_line)
+
+def split_log_time(log_line: str) -> str:
+    """
+    Выделяет из строки лога подстроку с временной меткой
+    (первые сегменты строки по количеству сегментов в FORMAT_LOGTIME)
+    """
+    return get_time_parser(FORMAT_LOGTIME).split(log_line)
 
 
 def get_last_line(file_path: Path) -> str:
@@ -428,15 +3057,9 @@ def get_last_line(file_path: Path) -> str:
     except FileNotFoundError:
         return ""
 
-def check_buffer_and_exit() -> None:
-    """
-    Проверяет, что файл существует и не пуст.
-    Если условие не выполняется — выводит сообщение и завершает программу.
-    """
-    is_empty = not LOCAL_BUFFER_FILE.exists() or LOCAL_BUFFER_FILE.stat().st_size == 0
-    if is_empty:
-        print(f"Файл LOCAL_BUFFER_FILE: {LOCAL_BUFFER_FILE} пустой", file=sys.stderr)
-        sys.exit(0)
+def buffer_is_empty() -> bool:
+    """Проверяет, что буферный файл не существует или пуст"""
+    return not LOCAL_BUFFER_FILE.exists() or LOCAL_BUFFER_FILE.stat().st_size == 0
 
 def parse_arguments():
     parser = argparse.ArgumentParser(
@@ -448,9 +3071,35 @@ def parse_arguments():
     parser.add_argument(
         '-l',"--lc-path-to-logfile",
         type=validate_file,
-        required=True,
-        help="Путь к анализируемому лог-файлу (ОБЯЗАТЕЛЬНЫЙ ПАРАМЕТР).\n"
-             "Можно использовать относительный путь, он будет преобразован в полный."
+        help="Путь к анализируемому лог-файлу (ОБЯЗАТЕЛЬНЫЙ ПАРАМЕТР, если не задан --batch).\n"
+             "Можно использовать относительный путь, он будет преобразован в полный.\n"
+             "'-' - читать стандартный ввод (поток до конца ввода, с --follow - с записью отчетов\n"
+             "раз в --flush-interval секунд); отсечение уже обработанных строк - по времени\n"
+             "из lasttime, поэтому для разных потоков нужен разный --additional-name."
+    )
+
+    parser.add_argument(
+        "--batch",
+        nargs="+",
+        metavar="LOGFILE",
+        help="Пакетная обработка списка лог-файлов в пуле процессов.\n"
+             "Допускаются glob-шаблоны (в кавычках): --batch '/var/log/app/*.log'.\n"
+             "Для каждого файла применяется --pattern или правила из --config."
+    )
+
+    parser.add_argument(
+        "--batch-file",
+        metavar="PATH",
+        help="Файл со списком лог-файлов для --batch: один путь или glob-шаблон на строку,\n"
+             "пустые строки и строки, начинающиеся с '#', пропускаются.\n"
+             "Может использоваться вместе с --batch."
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Количество процессов для --batch. Default: количество CPU"
     )
 
     parser.add_argument(
@@ -486,6 +3135,41 @@ def parse_arguments():
              "Если не задан флаг '--relative-path-to-body'"
     )
 
+    parser.add_argument(
+        "--report-format",
+        choices=REPORT_FORMATS,
+        default="text",
+        help="Формат отчета: text - текстовые секции '---'; json - JSON Lines, один объект на отчет\n"
+             "(file, additional_name, pattern, total_lines, skipped_lines, lines или signatures).\n"
+             "Рядом с выходным файлом ведется <файл>.offset (JSON): размер файла после последнего отчета,\n"
+             "смещение его начала и сквозной номер, чтобы потребитель читал только новые отчеты.\n"
+             "Default: text"
+    )
+
+    parser.add_argument(
+        "--report-max-size",
+        type=validate_non_negative_float,
+        default=0,
+        metavar="MB",
+        help="Ротировать выходной файл (<файл>.1, <файл>.2, ...), если отчет увеличит его больше MB мегабайт.\n"
+             "Default: 0 (без ограничения)"
+    )
+
+    parser.add_argument(
+        "--report-max-reports",
+        type=validate_non_negative_int,
+        default=0,
+        help="Ротировать выходной файл, если в нем уже столько отчетов. Default: 0 (без ограничения)"
+    )
+
+    parser.add_argument(
+        "--report-backups",
+        type=validate_non_negative_int,
+        default=DEFAULT_REPORT_BACKUPS,
+        help="Количество хранимых ротированных выходных файлов; 0 - при ротации выходной файл удаляется.\n"
+             f"Default: {DEFAULT_REPORT_BACKUPS}"
+    )
+
     # TODO: описание
     parser.add_argument(
         "--cache-path",
@@ -538,6 +3222,227 @@ def parse_arguments():
         "`%%%%` \t\t|A literal `'%%'` character.\n"
     )
 
+    parser.add_argument(
+        "--full-scan",
+        action="store_true",
+        help="Игнорировать сохраненную в lasttime позицию и прочитать лог-файл с начала."
+    )
+
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Потоковый режим: фильтрация, отсечение по времени и выбор последних строк\n"
+             "выполняются за один проход по лог-файлу без буферного файла.\n"
+             "В памяти хранится не больше --limit-lines строк."
+    )
+
+    parser.add_argument(
+        "--reverse",
+        action="store_true",
+        help="Обратный режим: лог-файл читается блоками от конца, пока не найдено\n"
+             "--limit-lines строк или не достигнута сохраненная позиция (метка времени).\n"
+             "Время работы зависит от размера отчета, а не от размера лог-файла."
+    )
+
+    parser.add_argument(
+        "--skipped-count",
+        choices=["exact", "estimate"],
+        default="estimate",
+        help="Количество пропущенных строк в режиме --reverse:\n"
+             "exact    - точный подсчет отдельным проходом по непрочитанной части;\n"
+             "estimate - оценка по плотности найденных строк, выводится как 'Skipped lines: ~N'.\n"
+             "Default: estimate"
+    )
+
+    parser.add_argument(
+        "--no-bisect",
+        action="store_true",
+        help="Не искать начало новых записей двоичным поиском по времени.\n"
+             "По умолчанию, если сохраненная позиция недоступна (первый запуск, ротация,\n"
+             "потерянный lasttime), лог-файл читается с первой строки новее сохраненного времени.\n"
+             "Требует, чтобы записи в логе были упорядочены по времени."
+    )
+
+    parser.add_argument(
+        "--config",
+        type=validate_file,
+        help="Файл с набором правил для лог-файла (.toml, .json или .ini).\n"
+             "Все правила проверяются за одно чтение лог-файла, у каждого правила\n"
+             "свои pattern, limit_lines, path_to_body, full_path_to_body и additional_name\n"
+             "(ключ в lasttime). Незаданные параметры берутся из командной строки.\n"
+             "Пример TOML:\n"
+             "  [[rules]]\n"
+             "  additional_name = \"_err\"\n"
+             "  pattern = \"err T\"\n"
+             "  path_to_body = \"body_err\""
+    )
+
+    parser.add_argument(
+        "--scan-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Количество процессов для параллельного чтения одного большого лог-файла.\n"
+             "1 - чтение в одном процессе. Default: количество CPU"
+    )
+
+    parser.add_argument(
+        "--parallel-threshold",
+        type=int,
+        default=DEFAULT_PARALLEL_THRESHOLD_MB,
+        help="Объем новых данных в лог-файле (МБ), начиная с которого он читается параллельно.\n"
+             f"Default: {DEFAULT_PARALLEL_THRESHOLD_MB}"
+    )
+
+    parser.add_argument(
+        "--state-backend",
+        choices=sorted(STATE_BACKENDS),
+        default=DEFAULT_STATE_BACKEND,
+        help="Хранилище меток времени и позиций (lasttime) в каталоге кеша.\n"
+             "csv    - lasttime.csv, запись под блокировкой через временный файл;\n"
+             "sqlite - lasttime.sqlite, поиск по ключу без чтения всего файла.\n"
+             f"Default: {DEFAULT_STATE_BACKEND}"
+    )
+
+    parser.add_argument(
+        "--stats",
+        type=validate_stats_formats,
+        default="",
+        metavar="FORMATS",
+        help="Записать статистику запуска: время и процессорное время этапов, объем прочитанных данных,\n"
+             "количество просмотренных, найденных и пропущенных строк, задержку хранилища lasttime,\n"
+             "пиковый размер памяти. Форматы через запятую: json, prom (textfile collector node_exporter).\n"
+             "Файлы: <каталог>/<имя лог-файла><суфикс>.json|.prom"
+    )
+
+    parser.add_argument(
+        "--stats-dir",
+        default="",
+        help="Каталог файлов статистики. Default: <каталог кеша>/stats"
+    )
+
+    parser.add_argument(
+        "--multiline",
+        action="store_true",
+        help="Проверять многострочные записи (например, стек вызовов) вместо строк: запись начинается\n"
+             "строкой с временной меткой --format-logtime, строки без метки относятся к текущей записи.\n"
+             "Шаблон, отсечение по времени и --limit-lines применяются к записям целиком.\n"
+             "Включает --stream; не поддерживается с --follow"
+    )
+
+    parser.add_argument(
+        "--max-record-size",
+        type=int,
+        default=DEFAULT_MAX_RECORD_SIZE,
+        help="Максимальный размер записи в режиме --multiline, символов; продолжение записи сверх\n"
+             f"этого размера отбрасывается. Default: {DEFAULT_MAX_RECORD_SIZE}"
+    )
+
+    parser.add_argument(
+        "--aggregate",
+        type=int,
+        nargs="?",
+        const=DEFAULT_TOP_K,
+        default=0,
+        metavar="K",
+        help="Вместо последних строк выводить в отчет --limit-lines самых частых сигнатур строк:\n"
+             "строка без временной метки, числа, шестнадцатеричные значения и UUID заменены на\n"
+             "<num>, <hex>, <uuid>. Для каждой сигнатуры: количество, первое и последнее появление,\n"
+             f"пример строки. Хранится не более 2 * K сигнатур. Default K: {DEFAULT_TOP_K}"
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Сохранить профиль запуска (cProfile) в каталог кеша лог-файла: profile-<время>-<pid>.prof.\n"
+             "Просмотр: python -m pstats <файл>"
+    )
+
+    parser.add_argument(
+        "--slow-threshold",
+        type=float,
+        default=0,
+        metavar="SECONDS",
+        help="Профилировать каждый запуск; если запуск дольше SECONDS секунд, сохранить профиль\n"
+             "и вывести в stderr самые затратные функции. Default: 0 (отключено)"
+    )
+
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Вывести в stderr пиковый объем памяти Python и места выделения памяти,\n"
+             "занятой к концу запуска (tracemalloc)"
+    )
+
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Поддерживать в каталоге кеша разреженный индекс временных меток лог-файла\n"
+             "(смещение строки и ее время примерно через каждые --index-step МБ).\n"
+             "Индекс дополняется при каждом запуске и строится заново при ротации.\n"
+             "Используется для --since/--until."
+    )
+
+    parser.add_argument(
+        "--index-step",
+        type=int,
+        default=DEFAULT_INDEX_STEP_MB,
+        help=f"Шаг индекса временных меток, МБ. Default: {DEFAULT_INDEX_STEP_MB}"
+    )
+
+    parser.add_argument(
+        "--since",
+        help="Выборка строк по --pattern с временем не раньше указанного (в формате --format-logtime).\n"
+             "Читается только нужный диапазон лог-файла по индексу временных меток,\n"
+             "lasttime не изменяется."
+    )
+
+    parser.add_argument(
+        "--until",
+        help="Выборка строк по --pattern с временем не позже указанного (в формате --format-logtime).\n"
+             "Можно использовать вместе с --since."
+    )
+
+    parser.add_argument(
+        "--follow",
+        action="store_true",
+        help="Режим слежения: лог-файлы (--lc-path-to-logfile и/или --batch) остаются открытыми,\n"
+             "дописанные строки проверяются сразу, отчеты пишутся раз в --flush-interval секунд.\n"
+             "Ротация и усечение лог-файла обрабатываются повторным открытием.\n"
+             "Завершение по SIGINT/SIGTERM."
+    )
+
+    parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=DEFAULT_FLUSH_INTERVAL,
+        help=f"Интервал записи отчетов и lasttime в режиме --follow, секунды. Default: {DEFAULT_FLUSH_INTERVAL}"
+    )
+
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help="Максимальная пауза между проверками лог-файлов в режиме --follow, секунды.\n"
+             "Пока новых данных нет, пауза удваивается до этого значения.\n"
+             f"Default: {DEFAULT_POLL_INTERVAL}"
+    )
+
+    parser.add_argument(
+        "--follow-threads",
+        type=int,
+        default=DEFAULT_FOLLOW_THREADS,
+        help=f"Количество потоков для чтения лог-файлов в режиме --follow. Default: {DEFAULT_FOLLOW_THREADS}"
+    )
+
+    parser.add_argument(
+        "--max-buffered-lines",
+        type=int,
+        default=DEFAULT_MAX_BUFFERED_LINES,
+        help="Предел суммарного числа строк, найденных с последней записи отчетов по всем лог-файлам, в режиме --follow.\n"
+             "При его достижении отчеты записываются досрочно, а чтение ждет окончания записи.\n"
+             f"Default: {DEFAULT_MAX_BUFFERED_LINES}"
+    )
+
     # Числовые параметры
     parser.add_argument(
         "--limit-lines",
@@ -547,13 +3452,54 @@ def parse_arguments():
         f"Default: {DEFAULT_LIMIT_LINES}"
     )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.batch_file:
+        try:
+            args.batch = (args.batch or []) + read_batch_file(args.batch_file)
+        except OSError as e:
+            parser.error(f"не удалось прочитать --batch-file: {e}")
+    if not args.lc_path_to_logfile and not args.batch:
+        parser.error("необходимо задать --lc-path-to-logfile или --batch")
+    return args
+
+def read_batch_file(path: str) -> list:
+    """Пути и glob-шаблоны из файла --batch-file"""
+    with open(path, encoding=ENCODING) as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
 
 def validate_file(path):
+    if path == STDIN_PATH:
+        return path
     if not os.path.isfile(path):
         raise argparse.ArgumentTypeError(f"Файл '{path}' не существует!")
     return path
 
+def validate_non_negative_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ожидается целое число: '{value}'")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"Значение не может быть отрицательным: {number}")
+    return number
+
+def validate_non_negative_float(value):
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Ожидается число: '{value}'")
+    if not number >= 0:
+        raise argparse.ArgumentTypeError(f"Значение не может быть отрицательным: {value}")
+    return number
+
+def validate_stats_formats(value):
+    formats = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in formats if name not in STATS_FORMATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Неизвестный формат статистики: {', '.join(unknown)}. "
+                                         f"Допустимо: {', '.join(STATS_FORMATS)}")
+    return ",".join(formats)
+
 def validate_regex(pattern):
     try:
         re.compile(pattern)  # Проверка корректности регулярки
@@ -0,0 +1,164 @@
+"""
+Сквозные проверки режимов командной строки cs_logchecker.py.
+
+Каждый тест запускает cs_logchecker.main() в отдельном процессе с каталогом
+кеша во временном каталоге (как benchmarks/bench_pipeline.py), проверяет
+код завершения и отчет, затем дописывает строки в лог-файл и проверяет,
+что повторный запуск сообщает только о новых строках.
+
+Запуск: python -m pytest tests
+"""
+from pathlib import Path
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = Path(__file__).resolve().parent.parent
+# Запуск cs_logchecker.main() с каталогом кеша теста вместо DEFAULT_CACHE_PATH
+CLI_RUNNER = (
+    "import sys, cs_logchecker; "
+    "cs_logchecker.DEFAULT_CACHE_PATH = sys.argv.pop(1); "
+    "cs_logchecker.main()"
+)
+
+
+def log_lines(start: int, count: int, level: str = "err T") -> list:
+    """Строки лога с последовательными секундными метками начиная с секунды start"""
+    return [f"2026-01-01 00:{(start + i) // 60:02d}:{(start + i) % 60:02d}.000 {level} message {start + i}\n"
+            for i in range(count)]
+
+
+class CliTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.cache = self.dir / "cache"
+        self.log = self.dir / "app.log"
+        self.body = self.dir / "body.txt"
+
+    def write_log(self, lines: list, path: Path = None, mode: str = "w") -> None:
+        with open(path or self.log, mode, encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def run_cli(self, *args: str, stdin: str = None) -> subprocess.CompletedProcess:
+        result = subprocess.run(
+            [sys.executable, "-c", CLI_RUNNER, f"{self.cache}/", *args],
+            input=stdin, capture_output=True, text=True, cwd=ROOT, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+        return result
+
+    def run_log(self, *args: str) -> subprocess.CompletedProcess:
+        return self.run_cli("-l", str(self.log), "--pattern", "err T",
+                            "--path-to-body", str(self.body), "--full-path-to-body", *args)
+
+    def take_report(self, path: Path = None) -> str:
+        """Содержимое отчета с удалением файла (следующий запуск пишет отчет заново)"""
+        path = path or self.body
+        text = path.read_text(encoding="utf-8")
+        path.unlink()
+        return text
+
+    def check_incremental(self, *args: str) -> None:
+        """Первый запуск находит все строки, повторный - только дописанные"""
+        self.write_log(log_lines(0, 10) + log_lines(10, 5, "inf T"))
+        self.run_log(*args)
+        report = self.take_report()
+        self.assertIn("message 0\n", report)
+        self.assertIn("message 9\n", report)
+        self.assertNotIn("message 10\n", report)
+
+        self.write_log(log_lines(15, 3), mode="a")
+        self.run_log(*args)
+        report = self.take_report()
+        self.assertIn("message 17\n", report)
+        self.assertNotIn("message 9\n", report)
+        self.assertIn("Skipped lines: 0\n", report)
+
+        # Без новых строк отчет не пишется
+        self.run_log(*args)
+        self.assertFalse(self.body.exists())
+
+    def test_default(self):
+        self.check_incremental()
+
+    def test_stream(self):
+        self.check_incremental("--stream")
+
+    def test_reverse(self):
+        self.check_incremental("--reverse")
+
+    def test_same_timestamp_after_checkpoint(self):
+        # Строка с той же меткой, что и последняя обработанная, дописана после сохраненной позиции
+        for args in ((), ("--stream",), ("--reverse",)):
+            with self.subTest(args=args):
+                self.cache = self.dir / f"cache{len(args)}{''.join(args)}"
+                self.write_log(["2026-01-01 00:00:01.000 err T a\n"])
+                self.run_log(*args)
+                self.take_report()
+                self.write_log(["2026-01-01 00:00:01.000 err T b\n", "2026-01-01 00:00:02.000 err T c\n"],
+                               mode="a")
+                self.run_log(*args)
+                report = self.take_report()
+                self.assertIn("err T b\n", report)
+                self.assertIn("err T c\n", report)
+                self.assertNotIn("err T a\n", report)
+
+    def test_config(self):
+        config = self.dir / "rules.json"
+        config.write_text(json.dumps({"rules": [
+            {"additional_name": "_err", "pattern": "err T", "path_to_body": str(self.dir / "err.txt"),
+             "full_path_to_body": True},
+            {"additional_name": "_inf", "pattern": "inf T", "path_to_body": str(self.dir / "inf.txt"),
+             "full_path_to_body": True},
+        ]}), encoding="utf-8")
+        self.write_log(log_lines(0, 3) + log_lines(3, 2, "inf T"))
+        self.run_cli("-l", str(self.log), "--config", str(config))
+        self.assertIn("message 2\n", self.take_report(self.dir / "err.txt"))
+        self.assertIn("message 4\n", self.take_report(self.dir / "inf.txt"))
+
+        self.write_log(log_lines(5, 1, "inf T"), mode="a")
+        self.run_cli("-l", str(self.log), "--config", str(config))
+        self.assertFalse((self.dir / "err.txt").exists())
+        report = self.take_report(self.dir / "inf.txt")
+        self.assertIn("message 5\n", report)
+        self.assertNotIn("message 4\n", report)
+
+    def test_batch(self):
+        other = self.dir / "other.log"
+        self.write_log(log_lines(0, 3))
+        self.write_log(log_lines(100, 2), other)
+        self.run_cli("--batch", str(self.log), str(other), "--workers", "2", "--pattern", "err T",
+                     "--path-to-body", str(self.body), "--full-path-to-body")
+        report = self.take_report()
+        self.assertEqual(report.count("File name: "), 2)
+        self.assertIn("message 2\n", report)
+        self.assertIn("message 101\n", report)
+
+        self.write_log(log_lines(102, 1), other, mode="a")
+        self.run_cli("--batch", str(self.log), str(other), "--workers", "2", "--pattern", "err T",
+                     "--path-to-body", str(self.body), "--full-path-to-body")
+        report = self.take_report()
+        self.assertEqual(report.count("File name: "), 1)
+        self.assertIn("message 102\n", report)
+
+    def test_stdin(self):
+        args = ("-l", "-", "--pattern", "err T", "--path-to-body", str(self.body), "--full-path-to-body")
+        self.run_cli(*args, stdin="".join(log_lines(0, 3) + log_lines(3, 1, "inf T")))
+        report = self.take_report()
+        self.assertIn("message 2\n", report)
+        self.assertNotIn("message 3\n", report)
+
+        # Повторно переданные строки отсекаются по времени из lasttime
+        self.run_cli(*args, stdin="".join(log_lines(0, 5)))
+        report = self.take_report()
+        self.assertIn("message 4\n", report)
+        self.assertNotIn("message 2\n", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+"""Проверки LogChecker при встраивании в другой процесс"""
+from contextlib import redirect_stderr
+from io import StringIO
+from pathlib import Path
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from cs_logchecker import CsvStateStore, LogChecker, SqliteStateStore  # noqa: E402
+
+
+class LogCheckerTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.log = self.dir / "app.log"
+        self.log.write_text("".join(f"2026-01-01 00:00:{i:02d}.000 err T message {i}\n" for i in range(30)),
+                            encoding="utf-8")
+
+    def test_store_delimiter(self):
+        # Состояние с нестандартным разделителем читается обратно из хранилища
+        for store_class in (CsvStateStore, SqliteStateStore):
+            with self.subTest(store=store_class.__name__):
+                store = store_class(self.dir / f"state.{store_class.__name__}", ";")
+                checker = LogChecker(self.log, pattern="err T", csv_delimiter=";", store=store)
+                self.assertEqual(checker.check().total_lines, 30)
+                again = LogChecker(self.log, pattern="err T", csv_delimiter=";", store=store)
+                self.assertEqual(again.check().total_lines, 0)
+
+    def test_quiet(self):
+        # Сообщения INFO о ходе чтения выводятся только при verbose=True
+        checker = LogChecker(self.log, pattern="err T")
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            checker.check()
+            checker.check()
+        self.assertEqual(stderr.getvalue(), "")
+
+        checker = LogChecker(self.log, pattern="err T", verbose=True)
+        checker.check()
+        with redirect_stderr(stderr):
+            checker.check()
+        self.assertIn("INFO: Продолжение чтения с позиции", stderr.getvalue())
+
+    def test_record_continued_after_checkpoint(self):
+        # Строки-продолжения, дописанные к последней записи после проверки, не теряются
+        log = self.dir / "records.log"
+        log.write_text("2026-01-01 00:00:01.000 err T boom\n  at a\n", encoding="utf-8")
+        checker = LogChecker(log, pattern="err T", max_record_size=1000)
+        self.assertEqual(checker.check().lines, ["2026-01-01 00:00:01.000 err T boom\n  at a\n"])
+        with log.open("a", encoding="utf-8") as f:
+            f.write("  at b\n2026-01-01 00:00:02.000 inf T next\n")
+        self.assertEqual(checker.check().lines, ["2026-01-01 00:00:01.000 err T boom\n  at a\n  at b\n"])
+        self.assertEqual(checker.check().lines, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""Проверки разбора временных меток LogTimeParser"""
+from pathlib import Path
+import sys
+import unittest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import cs_logchecker  # noqa: E402
+from cs_logchecker import CustomDateTime, LogTimeParser  # noqa: E402
+
+
+class LogTimeParserTest(unittest.TestCase):
+
+    def test_fixed_width(self):
+        parser = LogTimeParser(cs_logchecker.DEFAULT_FORMAT_LOGTIME)
+        self.assertTrue(parser.width)
+        self.assertEqual(parser.parse_line("2026-01-02 03:04:05.678 err T x\n"),
+                         CustomDateTime(2026, 1, 2, 3, 4, 5, 678000))
+        self.assertIsNone(parser.try_parse_line("    at frame\n"))
+
+    def test_strptime_formats(self):
+        # Директивы без предкомпилированного разбора: строки разбираются datetime.strptime
+        cases = [
+            ("%Y-%m-%d %I:%M:%S %p", "2026-01-02 01:04:05 PM err", CustomDateTime(2026, 1, 2, 13, 4, 5)),
+            ("%Y-%m-%dT%H:%M:%S%z", "2026-01-02T03:04:05+0000 err", CustomDateTime(2026, 1, 2, 3, 4, 5)),
+            ("%d %b %Y %H:%M:%S", "02 Jan 2026 03:04:05 err", CustomDateTime(2026, 1, 2, 3, 4, 5)),
+        ]
+        for format_str, line, expected in cases:
+            with self.subTest(format_str=format_str):
+                parser = LogTimeParser(format_str)
+                self.assertEqual(parser.width, 0)
+                self.assertEqual(parser.parse_line(line), expected)
+                self.assertIsNone(parser.try_parse_line("    at frame"))
+                self.assertEqual(parser.parse_lines([line, "    at frame"]), [expected, None])
+
+
+if __name__ == "__main__":
+    unittest.main()